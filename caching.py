@@ -0,0 +1,177 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           A columnar cache for the raw *.csv.zip files.
+#
+#           Parsing bureau_balance (27.3M rows) or installments_payments
+#           (13.6M rows) with pd.read_csv() takes most of the run time
+#           of a stage. On first read, we convert the raw file to an
+#           uncompressed feather (Arrow IPC) file. Such a file keeps
+#           dtypes, is columnar and can be memory-mapped. All later
+#           reads are served from it as long as the source file
+#           has not changed (checked through its sha1 hash).
+#
+# Usage:
+#           import caching
+#           bureau = caching.read_csv_cached('bureau.csv.zip', nrows = num_rows)
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import hashlib
+import pandas as pd
+
+# 1.1 pyarrow is needed to write/read feather files.
+#     If it is not installed, we fall back to
+#     plain pd.read_csv()
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
+
+
+# 2.0 Folder (relative to the data folder) where
+#     cached files are kept
+cache_folder = "cache"
+
+
+# 3.0 sha1 hash of a (large) file. File is read in blocks
+#     so that it is never fully held in memory.
+
+def file_hash(filename, block_size = 2**20):
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+# 3.1 Names of cached file and its sidecar (meta) file.
+#     'bureau.csv.zip' --> 'cache/bureau.feather', 'cache/bureau.json'
+
+def cache_paths(filename, folder = None):
+    folder = cache_folder if folder is None else folder
+    name = os.path.basename(filename).split('.')[0]
+    return (os.path.join(folder, name + '.feather'),
+            os.path.join(folder, name + '.json'))
+
+
+# 3.2 Options with which the cached file was parsed.
+#     If these change, cache must be rebuilt.
+
+def _options_key(read_options):
+    return json.dumps(read_options, sort_keys = True, default = _jsonable)
+
+
+# 3.3 Categorical dtypes are keyed by their
+#     categories; other objects by their name
+
+def _jsonable(o):
+    if isinstance(o, pd.CategoricalDtype) and o.categories is not None:
+        return ['category'] + [str(c) for c in o.categories]
+    return str(o)
+
+
+# 4.0 Is the cached file still valid for this source file?
+#     i)   A cheap check first: size and modification time
+#     ii)  If either differs, compare sha1 hashes. A file
+#          that was only 'touched' does not force a rebuild.
+
+def is_valid(filename, meta_file, read_options = None):
+    if not os.path.exists(meta_file):
+        return False
+    with open(meta_file) as f:
+        meta = json.load(f)
+    if meta.get('options') != _options_key(read_options or {}):
+        return False
+    stat = os.stat(filename)
+    if meta['size'] == stat.st_size and meta['mtime'] == stat.st_mtime:
+        return True
+    if meta['sha1'] != file_hash(filename):
+        return False
+    # 4.1 Same contents. Record new mtime to skip hashing next time
+    meta['size'], meta['mtime'] = stat.st_size, stat.st_mtime
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f, indent = 1)
+    return True
+
+
+# 5.0 Parse the source file once and write it to cache.
+#     Feather file is written uncompressed so that it
+#     can be memory-mapped while reading.
+
+def build_cache(filename, folder = None, **read_options):
+    data_file, meta_file = cache_paths(filename, folder)
+    os.makedirs(os.path.dirname(data_file) or '.', exist_ok = True)
+    df = pd.read_csv(filename, **read_options)
+    feather.write_feather(df, data_file, compression = 'uncompressed')
+    stat = os.stat(filename)
+    meta = {
+            'source':  os.path.basename(filename),
+            'sha1':    file_hash(filename),
+            'size':    stat.st_size,
+            'mtime':   stat.st_mtime,
+            'options': _options_key(read_options),
+            'shape':   list(df.shape),
+            'dtypes':  {c: str(t) for c, t in df.dtypes.items()}
+           }
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f, indent = 1)
+    return df
+
+
+# 6.0 Make sure a valid cached file exists for a source
+#     file. Returns name of cached file and, if the cache
+#     had to be (re)built, the parsed DataFrame.
+
+def ensure_cache(filename, folder = None, **read_options):
+    data_file, meta_file = cache_paths(filename, folder)
+    if os.path.exists(data_file) and is_valid(filename, meta_file, read_options):
+        return data_file, None
+    return data_file, build_cache(filename, folder, **read_options)
+
+
+# 6.1 Read a cached file. It is memory-mapped; columns
+#     not asked for are never read.
+
+def read_cached(data_file, nrows = None, usecols = None):
+    meta_file = data_file[:-len('.feather')] + '.json'
+    table = feather.read_table(data_file,
+                               columns = None if usecols is None else
+                                         [c for c in _cached_columns(meta_file) if c in usecols],
+                               memory_map = True
+                              )
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    return table.to_pandas()
+
+
+# 6.2 Drop-in replacement for pd.read_csv(filename, nrows = ..., usecols = ...)
+#     i)   Cache is always built from the full file, so that a
+#          sampled run does not leave behind a truncated cache
+#    ii)   'usecols' is pushed down to the feather reader: columns
+#          not asked for are never read
+#   iii)   'read_options' (eg dtype) are passed on to pd.read_csv()
+#          when the cache is built
+
+def read_csv_cached(filename, nrows = None, usecols = None, folder = None, **read_options):
+    if feather is None:
+        return pd.read_csv(filename, nrows = nrows, usecols = usecols, **read_options)
+
+    data_file, df = ensure_cache(filename, folder, **read_options)
+    if df is None:
+        return read_cached(data_file, nrows, usecols)
+    if usecols is not None:
+        df = df[[c for c in df.columns if c in usecols]]
+    return df if nrows is None else df.iloc[:nrows].copy()
+
+
+# 6.3 Column names (in file order) of a cached file
+
+def _cached_columns(meta_file):
+    with open(meta_file) as f:
+        return list(json.load(f)['dtypes'])
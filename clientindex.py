@@ -0,0 +1,239 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           A client index per table: rows sorted by key once, plus
+#           offsets (as in CSR), saved next to the cached table.
+#
+#           Every run of a stage notebook sorts (or hashes) its
+#           table by SK_ID_CURR again: to aggregate, to count rows
+#           per client (POS_COUNT, INSTAL_COUNT, CC_COUNT), to look
+#           up one client. Here, once per raw file (see caching.py):
+#             i)   the cached table is sorted by key (a stable sort:
+#                  rows of a client keep their file order) and saved
+#                  as another uncompressed feather file, next to the
+#                  cached one; eg cache/POS_CASH_balance.SK_ID_CURR.feather
+#            ii)   the distinct keys (ids) and offsets of their rows
+#                  are saved too: rows of ids[i] are
+#                  [offsets[i], offsets[i + 1])
+#           iii)   both are rebuilt only if the cached table is (ie
+#                  if the raw file changed)
+#           Then:
+#             -    rows per client are np.diff(offsets)
+#             -    rows of one client are one slice of the memory-
+#                  mapped file; its position is found in O(1) (a
+#                  dense array over the range of ids)
+#             -    tables read through the index are already sorted
+#                  by key; their offsets come from the saved ones.
+#                  plan.execute(..., client_index = ...) (see
+#                  planner.py) builds segments straight from them
+#                  (Segments.from_offsets()): keys are neither sorted
+#                  nor compared
+#
+#           Results are the same as from rows in file order.
+#
+# Usage:
+#           import clientindex
+#           pos, pos_index = clientindex.read_csv_indexed('POS_CASH_balance.csv.zip',
+#                                                         usecols = usecols, index = True)
+#           pos_agg = plan.execute('pos_cash_balance', pos, client_index = pos_index)['pos']
+#
+#           index = clientindex.ensure_index('POS_CASH_balance.csv.zip')
+#           index.sizes()                      # rows per SK_ID_CURR
+#           index.lookup(100006)               # rows of one client
+#           seg = index.segments()             # see segments.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# 1.1 Sorted tables are kept along with the cached
+#     ones. See caching.py
+import caching
+import sampling
+import segments
+
+
+# 2.0 A dense position array is used (for O(1) lookup)
+#     if ids span at most so many times their number;
+#     else, a binary search
+dense_span = 8
+
+
+# 3.0 Names of the sorted table, its offsets and sidecar.
+#     'bureau.csv.zip' --> 'cache/bureau.SK_ID_CURR.feather',
+#     'cache/bureau.SK_ID_CURR.npz', 'cache/bureau.SK_ID_CURR.json'
+
+def index_paths(filename, key = 'SK_ID_CURR', folder = None):
+    data_file, _ = caching.cache_paths(filename, folder)
+    stem = data_file[:-len('.feather')] + '.' + key
+    return stem + '.feather', stem + '.npz', stem + '.json'
+
+
+# 4.0 Rows sorted by key, as ids and offsets
+
+class ClientIndex:
+
+    def __init__(self, ids, offsets, key = 'SK_ID_CURR', data_file = None):
+        self.ids = np.asarray(ids)
+        self.offsets = np.asarray(offsets, dtype = np.int64)
+        self.key = key
+        self.data_file = data_file
+        # 4.0.1 Position of every id in the range of ids
+        self._dense = None
+        if len(self.ids) and self.ids.dtype.kind in 'iu':
+            low, span = int(self.ids[0]), int(self.ids[-1]) - int(self.ids[0]) + 1
+            if span <= dense_span * len(self.ids):
+                self._dense = np.full(span, -1, dtype = np.int64)
+                self._dense[self.ids - low] = np.arange(len(self.ids))
+
+
+    # 4.1 Index of rows already sorted by key
+    @classmethod
+    def from_keys(cls, keys, key = 'SK_ID_CURR', data_file = None):
+        keys = np.asarray(keys)
+        if len(keys) > 1 and not (keys[1:] >= keys[:-1]).all():
+            raise ValueError("Rows are not sorted by " + key)
+        starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate(([0], starts)) if len(keys) else starts
+        return cls(keys[starts], np.append(starts, len(keys)), key, data_file)
+
+
+    # 4.2 Rows per key
+    def sizes(self):
+        return pd.Series(np.diff(self.offsets), index = pd.Index(self.ids, name = self.key))
+
+
+    # 4.3 Position of a key among ids; -1 if absent
+    def position(self, id):
+        if self._dense is not None:
+            at = int(id) - int(self.ids[0])
+            return int(self._dense[at]) if 0 <= at < len(self._dense) else -1
+        at = int(np.searchsorted(self.ids, id))
+        return at if at < len(self.ids) and self.ids[at] == id else -1
+
+
+    # 4.4 Rows of one key: a slice (empty if absent)
+    def rows(self, id):
+        at = self.position(id)
+        return slice(0, 0) if at < 0 else slice(int(self.offsets[at]), int(self.offsets[at + 1]))
+
+
+    # 4.5 Rows of one key as a frame. Only that slice of
+    #     the (memory-mapped) sorted table is read
+    def lookup(self, id, usecols = None):
+        rows = self.rows(id)
+        table = caching.feather.read_table(self.data_file, columns = _columns(self.data_file, usecols),
+                                           memory_map = True)
+        return table.slice(rows.start, rows.stop - rows.start).to_pandas()
+
+
+    # 4.6 Segments over the rows indexed (eg all rows of
+    #     the sorted table). within: see segments.py
+    def segments(self, backend = None, within = None):
+        return segments.Segments.from_offsets(self.ids, self.offsets, self.key, backend, within)
+
+
+    # 4.7 Index of the rows kept: 'keep' is a mask over
+    #     keys (ids); then only the first nrows rows
+    def subset(self, keep = None, nrows = None):
+        ids, offsets = self.ids, self.offsets
+        if keep is not None:
+            ids = ids[keep]
+            offsets = np.concatenate(([0], np.cumsum(np.diff(offsets)[keep])))
+        if nrows is not None and nrows < offsets[-1]:
+            first = offsets[:-1] < nrows
+            ids, offsets = ids[first], np.append(offsets[:-1][first], nrows)
+        return ClientIndex(ids, offsets, self.key, self.data_file)
+
+
+# 5.0 Sort a cached table by key and save it, with
+#     its index. Returns the index.
+
+def build_index(filename, key = 'SK_ID_CURR', folder = None, **read_options):
+    data_file, _ = caching.ensure_cache(filename, folder, **read_options)
+    _, meta_file = caching.cache_paths(filename, folder)
+    sorted_file, offsets_file, index_meta_file = index_paths(filename, key, folder)
+    table = caching.feather.read_table(data_file, memory_map = True)
+    keys = table.column(key).to_numpy()
+    if len(keys) > 1 and not (keys[1:] >= keys[:-1]).all():
+        order = np.argsort(keys, kind = 'stable')
+        table, keys = table.take(order), keys[order]
+    caching.feather.write_feather(table, sorted_file, compression = 'uncompressed')
+    index = ClientIndex.from_keys(keys, key, sorted_file)
+    np.savez(offsets_file, ids = index.ids, offsets = index.offsets)
+    with open(meta_file) as f:
+        meta = json.load(f)
+    with open(index_meta_file, 'w') as f:
+        json.dump({'key': key, 'sha1': meta['sha1'], 'options': meta['options'], 'rows': len(keys),
+                   'dtypes': meta['dtypes']}, f, indent = 1)
+    return index
+
+
+# 5.1 Index of a raw file, built if there is none or if
+#     the cached table has changed (see caching.py)
+
+def ensure_index(filename, key = 'SK_ID_CURR', folder = None, **read_options):
+    data_file, _ = caching.ensure_cache(filename, folder, **read_options)
+    _, meta_file = caching.cache_paths(filename, folder)
+    sorted_file, offsets_file, index_meta_file = index_paths(filename, key, folder)
+    if os.path.exists(index_meta_file) and os.path.exists(sorted_file) and os.path.exists(offsets_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        with open(index_meta_file) as f:
+            index_meta = json.load(f)
+        if (index_meta['sha1'], index_meta['options']) == (meta['sha1'], meta['options']):
+            saved = np.load(offsets_file)
+            return ClientIndex(saved['ids'], saved['offsets'], key, sorted_file)
+    return build_index(filename, key, folder, **read_options)
+
+
+# 6.0 As sampling.read_csv_sampled(), but rows come sorted
+#     by key (from the sorted table). Sampling keeps
+#     whole keys, so rows stay sorted. nrows: the first
+#     rows in key order. Without pyarrow: read, then sort.
+#     index = True: also return the index of the rows
+#     read (offsets from the saved ones; see 4.7)
+
+def read_csv_indexed(filename, fraction = None, key = 'SK_ID_CURR', parent_ids = None,
+                     nrows = None, usecols = None, folder = None, index = False, **read_options):
+    if caching.feather is None:
+        df = sampling.read_csv_sampled(filename, fraction, key, parent_ids, None, usecols, folder,
+                                       **read_options)
+        keys = df[key].to_numpy()
+        order = np.argsort(keys, kind = 'stable')
+        df = df.iloc[order].reset_index(drop = True)
+        df = df if nrows is None else df.iloc[:nrows].copy()
+        return (df, ClientIndex.from_keys(keys[order][:len(df)], key)) if index else df
+    saved = ensure_index(filename, key, folder, **read_options)
+    columns = None if usecols is None else list(usecols) + ([key] if key not in usecols else [])
+    table = caching.feather.read_table(saved.data_file, columns = _columns(saved.data_file, columns),
+                                       memory_map = True)
+    keep = None
+    if fraction is not None or parent_ids is not None:
+        # 6.1 Whole keys are kept: a mask over ids, spread
+        #     over their rows
+        if parent_ids is not None:
+            keep = np.isin(saved.ids, np.asarray(parent_ids))
+        else:
+            keep = sampling.in_sample(saved.ids, fraction)
+        table = table.filter(caching.pa.array(np.repeat(keep, np.diff(saved.offsets))))
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    df = table.to_pandas()
+    if usecols is not None and key not in usecols:
+        df = df.drop(columns = [key])
+    return (df, saved.subset(keep, nrows)) if index else df
+
+
+# 6.2 Columns (in file order) of a sorted table
+
+def _columns(sorted_file, usecols):
+    if usecols is None:
+        return None
+    with open(sorted_file[:-len('.feather')] + '.json') as f:
+        return [c for c in json.load(f)['dtypes'] if c in usecols]
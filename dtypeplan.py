@@ -0,0 +1,181 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Reduce memory usage of a DataFrame through a saved
+#           'dtype plan'.
+#
+#           reducing.Reducer().reduce() works column by column, and
+#           does so afresh every time, on every table in every run.
+#           Here:
+#             i)   min, max and count of non-NaN values of all numeric
+#                  columns are computed at once, by vectorized pandas
+#                  reductions
+#            ii)   from these, the narrowest safe dtype of every column
+#                  is decided (same rules as in schemas.py). This is
+#                  the 'dtype plan' of the table. It is saved
+#           iii)   later runs load the plan and only cast. A cheap
+#                  min/max check guards against values outside the
+#                  planned range
+#            iv)   a plan can be fitted on several frames (eg train and
+#                  test) together; then all of them get identical dtypes
+#             v)   bytes before and after, per column, are reported
+#
+# Usage:
+#           import dtypeplan
+#           bureau_agg = dtypeplan.reduce(bureau_agg, 'processed_bureau_agg')
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# 1.1 Rules for narrowest dtype
+from schemas import narrowest_dtype
+
+
+# 2.0 Where plans are saved
+plan_folder = "dtype_plans"
+
+
+# 3.0 Stats of all numeric (non bool) columns of one or more
+#     frames, in one set of vectorized reductions per frame.
+#     Returns {column: {'kind', 'min', 'max', 'nan'}}
+
+def column_stats(*frames):
+    stats = {}
+    for df in frames:
+        num = df.select_dtypes(include = 'number', exclude = 'bool')
+        if num.shape[1] == 0:
+            continue
+        lo, hi, count = num.min(), num.max(), num.count()
+        for col in num.columns:
+            is_int = pd.api.types.is_integer_dtype(num[col].dtype)
+            has_nan = bool(count[col] < len(num))
+            # 3.1 A float column, without NaN, holding only whole
+            #     numbers may become an int column
+            if not is_int and not has_nan and count[col] > 0:
+                is_int = _whole(num[col].to_numpy())
+            s = {
+                 'kind': 'int' if is_int else 'float',
+                 'min':  None if count[col] == 0 else float(lo[col]),
+                 'max':  None if count[col] == 0 else float(hi[col]),
+                 'nan':  has_nan
+                }
+            if col in stats:
+                s = _merge(stats[col], s)
+            stats[col] = s
+    return stats
+
+
+# 3.2 Stats of the same column in two frames
+def _merge(a, b):
+    values = [v for v in (a['min'], b['min'], a['max'], b['max']) if v is not None]
+    return {
+            'kind': 'int' if a['kind'] == b['kind'] == 'int' else 'float',
+            'min':  min(values) if values else None,
+            'max':  max(values) if values else None,
+            'nan':  a['nan'] or b['nan']
+           }
+
+
+# 3.3 All values are whole numbers
+def _whole(values):
+    return bool(np.array_equal(values, np.trunc(values)))
+
+
+# 4.0 A dtype plan: {column: {'dtype', 'min', 'max'}}
+
+class DtypePlan:
+
+    def __init__(self, plan = None):
+        self.plan = plan or {}
+        self.changed = False
+
+
+    # 4.1 Fit plan on one or more frames (eg train and test)
+    def fit(self, *frames):
+        for col, s in column_stats(*frames).items():
+            self.plan[col] = {'dtype': narrowest_dtype(s), 'min': s['min'], 'max': s['max']}
+        self.changed = True
+        return self
+
+
+    # 4.2 Columns whose values fall outside the planned range
+    #     of an int dtype, or are not whole numbers (eg a mean
+    #     that was whole when fitted); or that are not yet
+    #     planned. Refitting makes these float again.
+    def _violations(self, df):
+        num = df.select_dtypes(include = 'number', exclude = 'bool')
+        unplanned = [c for c in num.columns if c not in self.plan]
+        planned_int = [c for c in num.columns
+                       if c in self.plan and self.plan[c]['dtype'].startswith('int')]
+        if not planned_int:
+            return unplanned
+        lo, hi, count = num[planned_int].min(), num[planned_int].max(), num[planned_int].count()
+        bad = [c for c in planned_int
+               if count[c] < len(num)
+               or np.iinfo(self.plan[c]['dtype']).min > lo[c]
+               or np.iinfo(self.plan[c]['dtype']).max < hi[c]
+               or (num[c].dtype.kind == 'f' and not _whole(num[c].to_numpy()))]
+        return unplanned + bad
+
+
+    # 4.3 Cast a frame as per plan
+    def apply(self, df, check = True):
+        if check:
+            redo = self._violations(df)
+            if redo:
+                self.fit(df[redo])
+        casts = {c: p['dtype'] for c, p in self.plan.items()
+                 if c in df.columns and str(df[c].dtype) != p['dtype']}
+        return df.astype(casts) if casts else df
+
+
+    # 4.4 Save/load
+    def save(self, filename):
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok = True)
+        with open(filename, 'w') as f:
+            json.dump(self.plan, f, indent = 1)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            return cls(json.load(f))
+
+
+# 5.0 Bytes used, per column, before and after
+
+def memory_report(before, after):
+    b = before.memory_usage(index = False, deep = True)
+    a = after.memory_usage(index = False, deep = True)
+    report = pd.DataFrame({
+                           'dtype_before': before.dtypes.astype(str),
+                           'dtype_after':  after.dtypes.astype(str),
+                           'bytes_before': b,
+                           'bytes_after':  a
+                          })
+    report.loc['TOTAL', ['bytes_before', 'bytes_after']] = [b.sum(), a.sum()]
+    return report
+
+
+# 6.0 Reduce memory usage of a frame using the saved
+#     plan of table 'name' (fitted and saved on first use).
+#     report = True: also return the memory report.
+
+def reduce(df, name, folder = None, report = False):
+    folder = plan_folder if folder is None else folder
+    filename = os.path.join(folder, name + '.json')
+    if os.path.exists(filename):
+        plan = DtypePlan.load(filename)
+    else:
+        plan = DtypePlan().fit(df)
+    reduced = plan.apply(df)
+    if plan.changed:
+        plan.save(filename)
+    if report:
+        return reduced, memory_report(df, reduced)
+    return reduced
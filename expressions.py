@@ -0,0 +1,286 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           A small expression engine for derived (ratio and
+#           difference) features.
+#
+#           Derived features, such as PAYMENT_PERC, DPD (installments),
+#           APP_CREDIT_PERC (previous applications) or PAYMENT_RATE
+#           (application), were computed one pandas operation at a
+#           time: every '/' or '-' made a full length temporary, and
+#           DPD/DBD were clipped by a python lambda, row by row, in
+#           .apply(). Here, a list of named expressions is:
+#             i)   parsed once. Only column names, numbers, + - * /,
+#                  unary minus and max(), min(), abs() are allowed
+#            ii)   evaluated in blocks of rows (block_rows). All
+#                  expressions of a block are evaluated together; a
+#                  column is read once for all of them
+#           iii)   written, in place, into one preallocated float32
+#                  block: one row of the block per expression
+#            iv)   on backend 'numba', compiled into one fused loop
+#                  over rows, run on all cores (one block of rows per
+#                  iteration of prange). On backend 'numpy', blocks
+#                  are evaluated by a pool of threads
+#
+#           Arithmetic is in float64; results are rounded to float32
+#           when stored. Defined handling of special values:
+#             x / 0 is inf (or -inf), 0 / 0 is NaN (as in numpy and
+#             pandas); NaN in, NaN out. max() and min() skip NaN
+#             (np.fmax, np.fmin): max(NaN, 0) is 0. With
+#             inf_as_nan = True, every result that is inf or -inf
+#             (eg x / 0, or too large for float32) is stored as NaN.
+#           An expression may use the value (as stored) of an
+#           expression above it.
+#
+# Usage:
+#           import expressions
+#           ins = expressions.assign(ins, {
+#                         'PAYMENT_PERC': 'AMT_PAYMENT / AMT_INSTALMENT',
+#                         'DPD':          'max(DAYS_ENTRY_PAYMENT - DAYS_INSTALMENT, 0)'
+#                                         })
+#
+#           ex = expressions.Expressions(plan.stages['ins']['expressions'])
+#           out = np.empty((len(ex.names), len(ins)), dtype = np.float32)
+#           ex.evaluate(ins, out, backend = 'numba')     # fills out
+#
+#           expressions.columns('AMT_PAYMENT / AMT_INSTALMENT')
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import ast
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# 1.1 numba compiles the fused loop. If it is not
+#     installed, backend 'numba' falls back to 'numpy'
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# 2.0 Rows per block
+block_rows = 65536
+
+# 2.1 Default backend: 'numpy' or 'numba' (as in segments.py)
+default_backend = "numpy"
+
+# 2.2 What an expression may contain
+_operators = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*'}
+_functions = {'max': 2, 'min': 2, 'abs': 1}
+
+
+# 3.0 An expression as python source over x0, x1, ...
+#     (columns) and e0, e1, ... (expressions above it).
+#     name_of: function(name) --> 'x3' or 'e0'
+
+def _emit(node, name_of):
+    if isinstance(node, ast.Expression):
+        return _emit(node.body, name_of)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+        return "_div(%s, %s)" % (_emit(node.left, name_of), _emit(node.right, name_of))
+    if isinstance(node, ast.BinOp) and type(node.op) in _operators:
+        return "(%s %s %s)" % (_emit(node.left, name_of), _operators[type(node.op)],
+                               _emit(node.right, name_of))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        return "(%s%s)" % ('-' if isinstance(node.op, ast.USub) else '+', _emit(node.operand, name_of))
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return repr(float(node.value))
+    if isinstance(node, ast.Name):
+        return name_of(node.id)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+            _functions.get(node.func.id) == len(node.args) and not node.keywords):
+        return "_%s(%s)" % (node.func.id, ", ".join(_emit(a, name_of) for a in node.args))
+    raise ValueError("Not supported in an expression: " + ast.unparse(node))
+
+
+# 3.1 Parse an expression
+
+def _parse(text):
+    try:
+        return ast.parse(text.strip(), mode = 'eval')
+    except SyntaxError:
+        raise ValueError("Cannot parse expression: " + text)
+
+
+# 3.2 Names (columns or other features) that an
+#     expression uses, in order of first use
+
+def columns(text):
+    names = [node.id for node in ast.walk(_parse(text)) if isinstance(node, ast.Name)]
+    return list(dict.fromkeys(n for n in names if n not in _functions))
+
+
+# 4.0 Helpers of the numpy path: on blocks of rows
+
+_numpy_helpers = {'_div': np.divide, '_max': np.fmax, '_min': np.fmin, '_abs': np.abs}
+
+
+# 4.1 Helpers of the numba path: on one row. Division
+#     as in numpy (error_model): x / 0 is inf, not an error
+
+if numba is not None:
+
+    @numba.njit(inline = 'always', error_model = 'numpy')
+    def _div(a, b):
+        return a / b
+
+    @numba.njit(inline = 'always')
+    def _max(a, b):
+        if a != a:
+            return b
+        if b != b:
+            return a
+        return a if a >= b else b
+
+    @numba.njit(inline = 'always')
+    def _min(a, b):
+        if a != a:
+            return b
+        if b != b:
+            return a
+        return a if a <= b else b
+
+    @numba.njit(inline = 'always')
+    def _abs(a):
+        return abs(a)
+
+# 4.2 Compiled (fused) loops: {expressions' source: kernel}
+_kernels = {}
+
+
+# 4.3 Source of one loop over rows, in blocks, that
+#     evaluates all expressions of a row together
+
+def _kernel_source(codes, n_columns):
+    args = ", ".join(["x%d" % i for i in range(n_columns)] + ["out", "inf_as_nan", "block"])
+    lines = ["def kernel(%s):" % args,
+             "    n = out.shape[1]",
+             "    for b in numba.prange((n + block - 1) // block):",
+             "        for i in range(b * block, min(n, (b + 1) * block)):"]
+    lines += ["            x%d_i = float(x%d[i])" % (i, i) for i in range(n_columns)]
+    for j, code in enumerate(codes):
+        lines += ["            w = np.float32(%s)" % code,
+                  "            if inf_as_nan and (w == np.inf or w == -np.inf):",
+                  "                w = np.float32(np.nan)",
+                  "            out[%d, i] = w" % j,
+                  "            e%d_i = float(w)" % j]
+    return "\n".join(lines)
+
+
+def _kernel(codes, n_columns):
+    source = (tuple(codes), n_columns)
+    if source not in _kernels:
+        scope = {'np': np, 'numba': numba, '_div': _div, '_max': _max, '_min': _min, '_abs': _abs}
+        exec(_kernel_source(codes, n_columns), scope)
+        _kernels[source] = numba.njit(parallel = True, error_model = 'numpy')(scope['kernel'])
+    return _kernels[source]
+
+
+# 5.0 Compiled list of expressions: {feature: expression},
+#     in order
+
+class Expressions:
+
+    def __init__(self, expressions):
+        self.names = list(expressions)
+        self.columns = []
+        trees = []
+        for name, text in expressions.items():
+            trees.append(_parse(text))
+            for col in columns(text):
+                if col not in self.names[:len(trees) - 1] and col not in self.columns:
+                    self.columns.append(col)
+        # 5.1 Source of each expression: block names for the
+        #     numpy path, row names for the numba path
+        self._codes = [self._source(tree, self.names[:j], "%s") for j, tree in enumerate(trees)]
+        self._row_codes = [self._source(tree, self.names[:j], "%s_i") for j, tree in enumerate(trees)]
+        self._compiled = [compile(code, name, 'eval') for code, name in zip(self._codes, self.names)]
+
+
+    # 5.2 Earlier expressions are used by value (e0),
+    #     other names are columns (x0)
+    def _source(self, tree, above, form):
+        def name_of(name):
+            if name in above:
+                return form % ("e%d" % above.index(name))
+            return form % ("x%d" % self.columns.index(name))
+        return _emit(tree, name_of)
+
+
+    # 5.3 Columns of df as numpy arrays (no copy if
+    #     already numeric)
+    def _inputs(self, df):
+        missing = [c for c in self.columns if c not in df.columns]
+        if missing:
+            raise KeyError("Columns not in frame: " + ", ".join(missing))
+        inputs = []
+        for col in self.columns:
+            values = df[col].to_numpy()
+            if values.dtype.kind not in 'biuf':
+                values = df[col].to_numpy(dtype = np.float64, na_value = np.nan)
+            inputs.append(values.view(np.uint8) if values.dtype == np.bool_ else values)
+        return inputs
+
+
+    # 6.0 Evaluate all expressions over rows of df into
+    #     out: float32 array of shape (expressions, rows),
+    #     created if not given. Returns out.
+
+    def evaluate(self, df, out = None, backend = None, inf_as_nan = False, threads = None, block = None):
+        n = len(df)
+        block = block_rows if block is None else block
+        if out is None:
+            out = np.empty((len(self.names), n), dtype = np.float32)
+        if out.dtype != np.float32 or out.shape != (len(self.names), n) or not out.flags.c_contiguous:
+            raise ValueError("out must be a C-contiguous float32 array of shape " +
+                             str((len(self.names), n)))
+        inputs = self._inputs(df)
+        backend = default_backend if backend is None else backend
+        if n == 0 or not self.names:
+            return out
+        if backend == 'numba' and numba is not None:
+            _kernel(self._row_codes, len(inputs))(*inputs, out, inf_as_nan, block)
+            return out
+
+        # 6.1 numpy: blocks are independent; numpy lets
+        #     go of the GIL, so threads overlap
+        def evaluate_block(lo):
+            hi = min(n, lo + block)
+            scope = {"x%d" % i: x[lo:hi].astype(np.float64) for i, x in enumerate(inputs)}
+            with np.errstate(divide = 'ignore', invalid = 'ignore', over = 'ignore'):
+                for j, code in enumerate(self._compiled):
+                    row = out[j, lo:hi]
+                    row[:] = eval(code, _numpy_helpers, scope)
+                    if inf_as_nan:
+                        row[np.isinf(row)] = np.nan
+                    scope["e%d" % j] = row.astype(np.float64)
+
+        threads = (os.cpu_count() or 1) if threads is None else threads
+        starts = range(0, n, block)
+        if threads <= 1 or len(starts) == 1:
+            for lo in starts:
+                evaluate_block(lo)
+        else:
+            with ThreadPoolExecutor(max_workers = threads) as pool:
+                list(pool.map(evaluate_block, starts))
+        return out
+
+
+    # 6.2 Add every expression to df as a (float32) column
+    def assign(self, df, **kwargs):
+        out = self.evaluate(df, **kwargs)
+        for j, name in enumerate(self.names):
+            df[name] = out[j]
+        return df
+
+
+# 7.0 Evaluate {feature: expression} and add the
+#     features to df. kwargs: as in evaluate()
+
+def assign(df, expressions, **kwargs):
+    return Expressions(expressions).assign(df, **kwargs)
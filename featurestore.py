@@ -0,0 +1,127 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           A keyed, columnar store for processed (aggregated) features.
+#
+#           Stages used to save their results as processed_*.csv.zip.
+#           join_all_processed.ipynb then re-parsed 800+ float columns
+#           from zipped text. Here, instead, every processed table is
+#           saved as a compressed parquet file:
+#             i)   rows sorted by SK_ID_CURR (the index)
+#            ii)   dtypes kept as they are; no float --> text --> float
+#                  round trip and so no loss
+#           iii)   columns can be read individually. So the join stage
+#                  loads only those features that it needs.
+#
+# Usage:
+#           import featurestore
+#           featurestore.write_features(bureau_agg, 'processed_bureau_agg')
+#           bureau_agg = featurestore.read_features('processed_bureau_agg',
+#                                                   columns = ['BURO_DAYS_CREDIT_MEAN'])
+#
+#           writer = featurestore.FeatureWriter('processed_ins_agg')
+#           for part in parts:           # in key order
+#               writer.write(part)
+#           writer.close()
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import pandas as pd
+
+# 1.1 pyarrow reads/writes parquet files
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# 2.0 Where stored features are kept
+store_folder = "features"
+
+# 2.1 Rows per row-group. A row-group is the
+#     smallest unit of rows read from disk.
+row_group_size = 100000
+
+
+# 3.0 File of a feature table
+def feature_path(name, folder = None):
+    folder = store_folder if folder is None else folder
+    return os.path.join(folder, name + '.parquet')
+
+
+# 4.0 Save a feature table.
+#     i)   key: if it is a column, it becomes the index
+#    ii)   rows are sorted by key
+#   iii)   'zstd' compresses floats well and decompresses fast
+
+def write_features(df, name, key = 'SK_ID_CURR', folder = None, compression = 'zstd'):
+    if key in df.columns:
+        df = df.set_index(key)
+    if df.index.name != key:
+        raise ValueError("Feature table '%s' is not keyed on %s" % (name, key))
+    df = df.sort_index()
+    filename = feature_path(name, folder)
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok = True)
+    table = pa.Table.from_pandas(df, preserve_index = True)
+    pq.write_table(table, filename,
+                   compression = compression,
+                   row_group_size = row_group_size
+                  )
+    return filename
+
+
+# 4.1 Save a feature table in parts, as they come (eg one
+#     key-range partition at a time; see spill.py). Parts
+#     must come in key order. Each is written out as row
+#     groups and need not be kept.
+
+class FeatureWriter:
+
+    def __init__(self, name, key = 'SK_ID_CURR', folder = None, compression = 'zstd'):
+        self.name = name
+        self.key = key
+        self.filename = feature_path(name, folder)
+        self.compression = compression
+        self.writer = None
+
+    def write(self, df):
+        if self.key in df.columns:
+            df = df.set_index(self.key)
+        if df.index.name != self.key:
+            raise ValueError("Feature table '%s' is not keyed on %s" % (self.name, self.key))
+        table = pa.Table.from_pandas(df.sort_index(), preserve_index = True)
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.filename) or '.', exist_ok = True)
+            self.writer = pq.ParquetWriter(self.filename, table.schema, compression = self.compression)
+        self.writer.write_table(table, row_group_size = row_group_size)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        return self.filename
+
+
+# 5.0 Names of stored features (without reading any data)
+def feature_columns(name, folder = None):
+    schema = pq.read_schema(feature_path(name, folder))
+    index = set(schema.pandas_metadata.get('index_columns', []))
+    return [c for c in schema.names if c not in index]
+
+
+# 5.1 Read a feature table, keyed on its index.
+#     i)   columns: features to read (None: all)
+#    ii)   ids:     only these keys (None: all)
+
+def read_features(name, columns = None, ids = None, key = 'SK_ID_CURR', folder = None):
+    filters = None if ids is None else [(key, 'in', list(ids))]
+    if columns is not None:
+        columns = [key] + [c for c in columns if c != key]
+    table = pq.read_table(feature_path(name, folder),
+                          columns = columns,
+                          filters = filters
+                         )
+    df = table.to_pandas()
+    if key in df.columns:
+        df = df.set_index(key)
+    return df
@@ -0,0 +1,127 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Concurrent ingest of the seven raw tables.
+#
+#           Raw files are independent of each other. Yet each is
+#           decompressed and parsed one after another, in its own
+#           notebook. Here, worker processes decompress and parse
+#           several files at the same time:
+#             i)   every worker parses one raw file (with its schema
+#                  dtypes) and writes it to the feather cache (see
+#                  caching.py). Only the cache file name comes back
+#                  to the parent process; no DataFrame is pickled
+#                  through pipes
+#            ii)   a file is started only if its estimated memory,
+#                  together with that of files being parsed, fits
+#                  within a global memory budget
+#           iii)   stages then read their tables from the cache,
+#                  memory-mapped, through caching.read_csv_cached()
+#
+# Usage:
+#           import ingest
+#           ingest.ingest_all(budget = 8 * 2**30, workers = 4)
+#
+#           or, from command line, in the data folder:
+#           python ingest.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# 1.1 Our modules
+import caching
+import schemas
+
+
+# 2.0 In memory, a parsed file takes (roughly) this
+#     many times its uncompressed (csv) size while
+#     it is being parsed
+expansion = 2.0
+
+
+# 3.0 Estimated memory (bytes) needed to parse a file
+
+def estimate_memory(filename):
+    if zipfile.is_zipfile(filename):
+        with zipfile.ZipFile(filename) as z:
+            size = sum(info.file_size for info in z.infolist())
+    else:
+        size = os.path.getsize(filename)
+    return int(size * expansion)
+
+
+# 4.0 Work done in a worker process: parse one raw
+#     file into the cache. Returns just the name of
+#     the cached (feather) file.
+
+def _ingest_one(table, filename, folder):
+    dtype = schemas.read_dtypes(table)
+    data_file, _ = caching.ensure_cache(filename, folder, dtype = dtype)
+    return data_file
+
+
+# 5.0 All raw files (of given tables) to be ingested
+#     as [(table, filename), ...], largest file first
+
+def raw_files(tables = None):
+    tables = list(schemas.tables) if tables is None else tables
+    jobs = [(table, filename) for table in tables for filename in schemas.tables[table][0]]
+    return sorted(jobs, key = lambda job: -estimate_memory(job[1]))
+
+
+# 6.0 Ingest raw files in parallel within a memory budget.
+#     i)   budget:  bytes that all workers, together, may use
+#    ii)   workers: number of worker processes (None: one per cpu)
+#   iii)   A file whose estimate alone exceeds the budget
+#          is parsed when no other file is being parsed
+#     Returns {filename: cached feather file}
+
+def ingest_all(tables = None, budget = 8 * 2**30, workers = None, folder = None):
+    # 6.1 Schemas are built (once) before workers start
+    #     so that two workers do not build the same schema
+    for table in (list(schemas.tables) if tables is None else tables):
+        schemas.load_schema(table)
+
+    pending = raw_files(tables)
+    running = {}             # future --> (filename, estimate)
+    done = {}
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        while pending or running:
+            in_use = sum(estimate for _, estimate in running.values())
+            # 6.2 Start as many pending files as fit
+            for job in list(pending):
+                table, filename = job
+                estimate = estimate_memory(filename)
+                if running and in_use + estimate > budget:
+                    continue
+                future = pool.submit(_ingest_one, table, filename, folder)
+                running[future] = (filename, estimate)
+                in_use += estimate
+                pending.remove(job)
+            # 6.3 Wait for any one to finish
+            finished, _ = wait(list(running), return_when = FIRST_COMPLETED)
+            for future in finished:
+                filename, _ = running.pop(future)
+                done[filename] = future.result()
+    return done
+
+
+# 7.0 Table of a stage, read from cache (memory-mapped).
+#     Same as what the stage notebooks read.
+
+def read_table(filename, table, nrows = None, usecols = None):
+    return caching.read_csv_cached(filename,
+                                   nrows = nrows,
+                                   usecols = usecols,
+                                   dtype = schemas.read_dtypes(table)
+                                  )
+
+
+if __name__ == '__main__':
+    for filename, data_file in ingest_all().items():
+        print(filename, '-->', data_file)
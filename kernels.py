@@ -0,0 +1,179 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Compiled (numba) kernels for segments.py.
+#
+#           POS_CASH_balance (10M rows), installments_payments (13.6M)
+#           and credit_card_balance (3.84M) are aggregated per
+#           SK_ID_CURR. segments.py sorts rows by key once; rows of
+#           a client are then contiguous. Here, plain loops over
+#           each such segment are compiled with numba and run on
+#           all cores (one segment per iteration of prange):
+#             i)   one kernel gives count, sum, min, max and the
+#                  second moment (about the segment mean) of a
+#                  column, in two passes over its segment
+#            ii)   another counts distinct values of each segment
+#           iii)   NaN (and rows outside a condition) are skipped
+#
+#           numba is optional. Without it, segments.py silently
+#           uses its numpy (ufunc.reduceat) path.
+#
+# Usage:
+#           import segments
+#           pos_agg = segments.aggregate(pos, 'SK_ID_CURR', aggregations, backend = 'numba')
+#
+#           Benchmark of pandas, numpy and numba paths on the
+#           three tables; from command line, in the data folder:
+#           python kernels.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import time
+import numpy as np
+
+# 1.1 numba compiles the kernels. If it is not
+#     installed, kernels are not available
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# 2.0 Kernels. 'where' of length 0 implies all rows.
+
+if numba is not None:
+
+    # 2.1 count, sum, min, max and sum of squared
+    #     deviations from mean, per segment
+    @numba.njit(parallel = True, cache = True)
+    def _moments(x, starts, ends, where):
+        n = len(starts)
+        count = np.zeros(n, dtype = np.int64)
+        total = np.zeros(n)
+        lo = np.full(n, np.nan)
+        hi = np.full(n, np.nan)
+        m2 = np.zeros(n)
+        all_rows = len(where) == 0
+        for i in numba.prange(n):
+            c = 0
+            s = 0.0
+            mn = np.inf
+            mx = -np.inf
+            for j in range(starts[i], ends[i]):
+                if all_rows or where[j]:
+                    v = float(x[j])
+                    if v == v:
+                        c += 1
+                        s += v
+                        mn = min(mn, v)
+                        mx = max(mx, v)
+            count[i] = c
+            total[i] = s
+            if c > 0:
+                lo[i] = mn
+                hi[i] = mx
+                mean = s / c
+                acc = 0.0
+                for j in range(starts[i], ends[i]):
+                    if all_rows or where[j]:
+                        v = float(x[j])
+                        if v == v:
+                            acc += (v - mean) * (v - mean)
+                m2[i] = acc
+        return count, total, lo, hi, m2
+
+
+    # 2.2 Number of distinct (non NaN) values per segment
+    @numba.njit(parallel = True, cache = True)
+    def _nunique(x, starts, ends, where):
+        n = len(starts)
+        out = np.zeros(n, dtype = np.int64)
+        all_rows = len(where) == 0
+        for i in numba.prange(n):
+            buf = np.empty(ends[i] - starts[i])
+            k = 0
+            for j in range(starts[i], ends[i]):
+                if all_rows or where[j]:
+                    v = float(x[j])
+                    if v == v:
+                        buf[k] = v
+                        k += 1
+            if k > 0:
+                v = np.sort(buf[:k])
+                distinct = 1
+                for j in range(1, k):
+                    if v[j] != v[j - 1]:
+                        distinct += 1
+                out[i] = distinct
+        return out
+
+
+# 3.0 Are kernels available?
+
+def available():
+    return numba is not None
+
+
+# 3.1 Moments of a (sorted) column over segments
+#     Returns {'count', 'sum', 'min', 'max', 'm2'}
+
+def moments(x, starts, ends, where = None):
+    where = np.empty(0, dtype = np.bool_) if where is None else where
+    x = x.view(np.uint8) if x.dtype == np.bool_ else x
+    count, total, lo, hi, m2 = _moments(x, starts, ends, where)
+    return {'count': count, 'sum': total, 'min': lo, 'max': hi, 'm2': m2}
+
+
+# 3.2 Distinct values of a (sorted) column over segments
+
+def nunique(x, starts, ends, where = None):
+    where = np.empty(0, dtype = np.bool_) if where is None else where
+    x = x.view(np.uint8) if x.dtype == np.bool_ else x
+    return _nunique(x, starts, ends, where)
+
+
+# 4.0 Benchmark: pandas groupby().agg(), numpy and numba
+#     paths of segments.aggregate() on the three monthly
+#     tables. Every numeric column gets all stats.
+#     Returns a frame of seconds taken.
+
+benchmark_tables = {
+                    'pos_cash_balance':      'POS_CASH_balance.csv.zip',
+                    'installments_payments': 'installments_payments.csv.zip',
+                    'credit_card_balance':   'credit_card_balance.csv.zip'
+                   }
+
+def benchmark(tables = None, stats = ('min', 'max', 'mean', 'sum', 'var', 'nunique', 'size')):
+    import pandas as pd
+    import caching
+    import schemas
+    import segments
+
+    tables = benchmark_tables if tables is None else tables
+    rows = []
+    for table, filename in tables.items():
+        df = caching.read_csv_cached(filename, dtype = schemas.read_dtypes(table))
+        num = [c for c in df.select_dtypes('number').columns if c not in ('SK_ID_CURR', 'SK_ID_PREV')]
+        aggregations = {c: list(stats) for c in num}
+        timings = {'table': table, 'rows': len(df)}
+
+        start = time.perf_counter()
+        df.groupby('SK_ID_CURR').agg(aggregations)
+        timings['pandas'] = time.perf_counter() - start
+
+        backends = ['numpy'] + (['numba'] if available() else [])
+        for backend in backends:
+            if backend == 'numba':
+                # 4.1 First call compiles; not timed
+                segments.aggregate(df.head(1000), 'SK_ID_CURR', aggregations, backend = backend)
+            start = time.perf_counter()
+            segments.aggregate(df, 'SK_ID_CURR', aggregations, backend = backend)
+            timings[backend] = time.perf_counter() - start
+        rows.append(timings)
+    return pd.DataFrame(rows).set_index('table')
+
+
+if __name__ == '__main__':
+    print(benchmark())
@@ -0,0 +1,215 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Loan-level (SK_ID_PREV) states, kept once and shared by
+#           loan-level and client-level features.
+#
+#           POS_CASH_balance, installments_payments and
+#           credit_card_balance have one row per month (or payment)
+#           of a previous loan (SK_ID_PREV). Their stages aggregate
+#           these rows straight to SK_ID_CURR; loan-level features,
+#           such as max DPD of a loan or what part of a loan's
+#           instalments was paid, are lost. Here:
+#             i)   rows are reduced, once, to mergeable states per
+#                  SK_ID_PREV (see states.py). The state holds all that
+#                  the client stage needs (eg 'pos') and all that its
+#                  loan stage needs (eg 'pos_loans'); it is saved, with
+#                  the SK_ID_PREV --> SK_ID_CURR link, in folder 'states'
+#            ii)   loan-level features come from the state: stats of the
+#                  loan stage, plus its 'stat_expressions' over them
+#                  (eg AMT_PAYMENT_SUM / AMT_INSTALMENT_SUM; see
+#                  expressions.py)
+#           iii)   client-level features come from the same state:
+#                  states of a client's loans are merged into one (as
+#                  states of two chunks are), and finalized. Columns
+#                  are those of the client stage. Loan-level features
+#                  are also aggregated over a client's loans, as per
+#                  'rolled_up' of the loan stage (eg mean of per-loan
+#                  max DPD)
+#           Monthly rows are scanned only in i).
+#
+#           A loan belongs to one client. Windows (see segments.py)
+#           need monthly rows; they are not available from states.
+#           Sums and variances merged from loans may differ from a
+#           scan of rows in the last bit.
+#
+# Usage:
+#           import loans
+#           usecols = loans.usecols(plan, 'pos')
+#           pos_loans = loans.LoanStates.build(plan, 'pos', pos)
+#           pos_loans.save('pos_loans')
+#           pos_loan_agg = pos_loans.loan_features()            # per SK_ID_PREV
+#           pos_agg = pos_loans.client_features()               # per SK_ID_CURR
+#
+#           pos_loans = loans.LoanStates.load('pos_loans')       # later
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import fnmatch
+import numpy as np
+import pandas as pd
+
+# 1.1 Helper modules in this folder
+import schemas
+import projection
+import segments
+import states
+import expressions
+
+
+# 2.0 Loan-level states: a states.GroupStates per
+#     SK_ID_PREV and its link to SK_ID_CURR.
+#       spec:       the loan stage (eg 'pos_loans'), as
+#                   resolved by planner.Plan()
+#       output:     of the client stage (see states.py 3.0)
+
+class LoanStates:
+
+    def __init__(self, loan_states, link, spec):
+        self.states = loan_states
+        self.link = link
+        self.spec = spec
+        self.key = loan_states.key
+        self.parent = link.name
+
+
+    # 2.1 States per loan of a client stage (eg 'pos') and
+    #     its loan stage (its 'loans'), over raw rows df
+    @classmethod
+    def build(cls, plan, stage, df, nan_as_category = True):
+        client = plan.stages[stage]
+        spec = plan._resolve(plan.specs, client['loans'])
+        loan_states = states.stage_states(client, df, nan_as_category, key = spec['key'],
+                                          extra = spec['aggregations'])
+        return cls(loan_states, _link(df, spec['key'], client['key']), spec)
+
+
+    # 2.2 Add a delta of new rows (see states.apply_delta())
+    def update(self, delta):
+        self.states.update(delta)
+        link = _link(delta, self.key, self.parent)
+        self.link = pd.concat([self.link, link[~link.index.isin(self.link.index)]]).sort_index()
+        return self
+
+
+    # 3.0 Loan-level features: stats of the loan stage
+    #     and stat_expressions over them, named
+    #     '<prefix><col>_<STAT>'. Its client is a column.
+    #     A ratio over a zero (eg no credit limit) is NaN
+    def loan_features(self, backend = None):
+        agg, _ = self.states.finalize(self.spec['aggregations'], dummy_stats = [], prefix = '', count = False)
+        if self.spec['stat_expressions']:
+            agg = expressions.assign(agg, self.spec['stat_expressions'], backend = backend, inf_as_nan = True)
+        agg.columns = [self.spec['prefix'] + c for c in agg.columns]
+        agg.insert(0, self.parent, self.link.reindex(agg.index).to_numpy())
+        return agg
+
+
+    # 4.0 Client-level states: states of all loans of
+    #     a client merged into one (as in GroupStates
+    #     merge_states(), but over many loans at once)
+    def client_states(self):
+        loan_states = self.states
+        state = loan_states.state
+        seg = segments.Segments(pd.Series(self.link.reindex(state.index).to_numpy(), name = self.parent))
+        def reduce(col, ufunc):
+            return ufunc.reduceat(seg.gather(state[col].to_numpy()), seg.starts)
+
+        moments = set()
+        out = {}
+        for col in loan_states.num_columns:
+            n, total = loan_states._n(col), loan_states._sum(col)
+            low, high, m2 = loan_states._min(col), loan_states._max(col), loan_states._m2(col)
+            moments.update([n, total, low, high, m2])
+            out[n] = reduce(n, np.add)
+            out[total] = reduce(total, np.add)
+            out[low] = reduce(low, np.fmin)
+            out[high] = reduce(high, np.fmax)
+            # 4.1 M2 of a client: M2 of its loans plus spread
+            #     of loan means about the client's mean
+            counts = seg.gather(state[n].to_numpy()).astype(np.float64)
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                delta = (seg.gather(state[total].to_numpy()) / counts -
+                         np.repeat(out[total] / out[n], seg.size))
+            spread = np.where(counts > 0, counts * delta * delta, 0.0)
+            out[m2] = reduce(m2, np.add) + seg.sum(spread)
+        # 4.2 Size and counts of categories add up
+        for col in state.columns:
+            if col not in moments:
+                out[col] = reduce(col, np.add)
+        client = states.GroupStates(self.parent, loan_states.num_columns, loan_states.cat_columns,
+                                    loan_states.nan_as_category, list(loan_states.distinct),
+                                    loan_states.output)
+        client.categories = {col: set(v) for col, v in loan_states.categories.items()}
+        client.dtypes = dict(loan_states.dtypes)
+        client.state = pd.DataFrame(out, index = pd.Index(seg.ids, name = self.parent))[state.columns]
+        # 4.3 Distinct values of a client: of any of its loans
+        for col, pairs in loan_states.distinct.items():
+            frame = pairs.to_frame(index = False)
+            frame[self.key] = self.link.reindex(frame[self.key]).to_numpy()
+            client.distinct[col] = pd.MultiIndex.from_frame(frame.rename(columns = {self.key: self.parent})
+                                                                 .drop_duplicates())
+        return client
+
+
+    # 5.0 Client-level features: columns of the client
+    #     stage plus loan-level features aggregated over
+    #     loans, as per 'rolled_up', named
+    #     '<loan feature>_<STAT>'
+    def client_features(self, backend = None):
+        agg, _ = self.client_states().finalize()
+        if self.spec['rolled_up']:
+            loan_agg = self.loan_features(backend)
+            rolled = {}
+            for pattern, stats in self.spec['rolled_up'].items():
+                for col in fnmatch.filter(loan_agg.columns[1:], pattern):
+                    rolled.setdefault(col, stats)
+            up = segments.aggregate(loan_agg, self.parent, rolled, backend)
+            up.columns = [col + '_' + stat.upper() for col, stat in up.columns]
+            agg = agg.join(up)
+        return agg
+
+
+    # 6.0 Save/load the states and the link, as
+    #     'name' in folder 'states' (see states.py)
+    def save(self, name, folder = None):
+        self.states.output = dict(self.states.output, loans = self.spec)
+        self.states.save(name, folder)
+        folder = states.state_folder if folder is None else folder
+        self.link.to_frame().to_parquet(os.path.join(folder, name + '.link.parquet'))
+
+    @classmethod
+    def load(cls, name, folder = None):
+        loan_states = states.GroupStates.load(name, folder)
+        folder = states.state_folder if folder is None else folder
+        link = pd.read_parquet(os.path.join(folder, name + '.link.parquet')).iloc[:, 0]
+        return cls(loan_states, link, loan_states.output['loans'])
+
+
+# 7.0 Client of every loan in df: a series indexed
+#     by loan key. A loan with two clients is an error.
+
+def _link(df, key, parent):
+    pairs = df[[key, parent]].drop_duplicates()
+    if pairs[key].duplicated().any():
+        raise ValueError("Some " + key + " belong to more than one " + parent)
+    return pairs.set_index(key)[parent].sort_index()
+
+
+# 8.0 Raw columns to read for a client stage (eg 'pos')
+#     and its loan stage: those of the client stage plus
+#     the loan key and columns of the loan stage. Derived
+#     features of the loan stage are those of the client
+#     stage.
+
+def usecols(plan, stage):
+    client = plan.stages[stage]
+    spec = plan._resolve(plan.specs, client['loans'])
+    needed = plan.usecols(client['table']) + projection.needed_columns(
+                                                      spec['aggregations'],
+                                                      keys = [spec['key'], client['key']],
+                                                      derived = client['derived'])
+    return [c for c in schemas.columns(client['table']) if c in needed]
@@ -0,0 +1,84 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Final (joined) feature matrix as a memory-mappable
+#           float32 file.
+#
+#           join_all_processed.ipynb saves a 356,251 x 808 frame as
+#           processed_df_joined.csv.zip. Every training or scoring
+#           job then re-parses it into float64. Here the same frame
+#           is also written as one contiguous (row major) float32
+#           matrix in a .npy file. Two small sidecar files keep
+#           column names and the SK_ID_CURR index. Any job (or many
+#           processes at once) can memory-map the matrix: no parse,
+#           no copy, and the OS shares the pages between processes.
+#
+# Usage:
+#           import matrix
+#           matrix.write_matrix(df, 'processed_df_joined')
+#           X, columns, index = matrix.load_matrix('processed_df_joined')
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import json
+import numpy as np
+import pandas as pd
+
+
+# 2.0 Files of a matrix:
+#       <name>.f32.npy       matrix
+#       <name>.index.npy     SK_ID_CURR of every row
+#       <name>.json          column names, shape, dtype
+
+def matrix_paths(name):
+    return name + '.f32.npy', name + '.index.npy', name + '.json'
+
+
+# 3.0 Write a (numeric) frame as float32 matrix.
+#     Rows are converted and written block by block so
+#     that a float32 copy of the whole frame is never
+#     held in memory.
+
+def write_matrix(df, name, block_rows = 50000):
+    data_file, index_file, meta_file = matrix_paths(name)
+    X = np.lib.format.open_memmap(data_file, mode = 'w+',
+                                  dtype = np.float32,
+                                  shape = df.shape
+                                 )
+    for start in range(0, len(df), block_rows):
+        block = df.iloc[start:start + block_rows]
+        X[start:start + len(block)] = block.to_numpy(dtype = np.float32, na_value = np.nan)
+    X.flush()
+    del X
+    np.save(index_file, df.index.to_numpy(dtype = np.int64))
+    meta = {
+            'columns': [str(c) for c in df.columns],
+            'index':   df.index.name,
+            'shape':   list(df.shape),
+            'dtype':   'float32'
+           }
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f, indent = 1)
+    return data_file
+
+
+# 4.0 Memory-map a matrix (read-only by default).
+#     Returns (matrix, column names, index)
+
+def load_matrix(name, mmap_mode = 'r'):
+    data_file, index_file, meta_file = matrix_paths(name)
+    with open(meta_file) as f:
+        meta = json.load(f)
+    X = np.load(data_file, mmap_mode = mmap_mode)
+    index = pd.Index(np.load(index_file), name = meta['index'])
+    return X, meta['columns'], index
+
+
+# 4.1 Same, as a DataFrame over the memory-mapped
+#     matrix (no copy is made)
+
+def load_frame(name):
+    X, columns, index = load_matrix(name)
+    return pd.DataFrame(X, columns = columns, index = index, copy = False)
@@ -0,0 +1,338 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Mean of one-hot encoded (dummy) columns per group,
+#           without creating the dummy columns.
+#
+#           In most stages, dummies made by one_hot_encoder() are
+#           only ever averaged per SK_ID_CURR (or SK_ID_BUREAU).
+#           Mean of a dummy column over a group is just the
+#           frequency of that value in the group. So here:
+#             i)   every 'object' (or 'category') column is turned
+#                  into integer codes (NaN is code 0)
+#            ii)   group number and code are combined into one
+#                  integer and counted with np.bincount(); this
+#                  gives a (groups x categories) table of counts
+#           iii)   counts divided by group size are the means
+#
+#           previous_application would otherwise grow by 159 dummy
+#           columns over 1.67M rows; bureau_balance from 3 to 11
+#           columns over 27M rows. Names of features are exactly
+#           those that pd.get_dummies() would have given.
+#
+#           Where dummies are needed (credit_card_balance takes their
+#           min, max, sum and var too), one_hot_encoder(sparse = True)
+#           keeps them as sparse columns. Such columns are mostly zero
+#           (eg '_nan' dummies of fully populated columns). Here:
+#             i)   sparse_group_agg() aggregates them per group
+#                  using only their stored (non-zero) values
+#            ii)   to_csr() gives a scipy CSR matrix of a frame, for
+#                  LightGBM, without densifying sparse columns.
+#                  (Joins of sparse columns are already sparse in pandas)
+#
+#           one_hot_encoder() takes categories from whatever frame it
+#           is given; a scoring batch may then get a different layout
+#           of columns. VocabularyEncoder learns the categories of
+#           every 'object' column once (fit) and saves them. Every
+#           later frame (transform) gets the same, ordered, dummy
+#           columns. Values not seen while fitting go to a reserved
+#           '<col>_unseen' dummy. Values are looked up through a hash
+#           index of the vocabulary; for a 'category' column only its
+#           categories are looked up, not its rows.
+#
+# Usage:
+#           import onehot
+#           cat_cols = onehot.dummy_columns(pos)
+#           pos_agg  = pos.groupby('SK_ID_CURR').agg(aggregations)
+#           pos_agg  = pos_agg.join(onehot.category_means(pos, 'SK_ID_CURR'))
+#
+#           cc_agg   = onehot.sparse_group_agg(cc, 'SK_ID_CURR', cat_cols)
+#           X        = onehot.to_csr(df.drop(columns = ['TARGET']))
+#
+#           df, cat_cols = onehot.encode(df, 'application')
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# 1.1 scipy is needed only for to_csr()
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
+
+# 2.0 'object' (or 'category') columns of a frame,
+#     same as one_hot_encoder() selects
+
+def categorical_columns(df, exclude = ()):
+    return [col for col in df.columns
+            if df[col].dtype.name in ('object', 'category') and col not in exclude]
+
+
+# 2.1 Integer codes and values of one column.
+#     Code 0 is NaN; value i (from 1) is categories[i - 1].
+#     A 'category' column has all its categories (even
+#     if absent in data); an 'object' column has its
+#     values sorted. This is what pd.get_dummies() does.
+
+def _codes(s):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy().astype(np.int64) + 1, list(s.cat.categories)
+    codes, categories = pd.factorize(s, sort = True)
+    return codes.astype(np.int64) + 1, list(categories)
+
+
+# 2.2 Names of dummy columns, as pd.get_dummies() names them
+
+def _names(col, categories, nan_as_category):
+    names = [f"{col}_{value}" for value in categories]
+    return names + [f"{col}_nan"] if nan_as_category else names
+
+
+# 3.0 Names of dummy columns of a frame, without creating them.
+#     Same as 'new_columns' returned by one_hot_encoder()
+
+def dummy_columns(df, columns = None, nan_as_category = True):
+    columns = categorical_columns(df) if columns is None else columns
+    names = []
+    for col in columns:
+        _, categories = _codes(df[col])
+        names += _names(col, categories, nan_as_category)
+    return names
+
+
+# 4.0 Mean of every dummy column per group of 'key'.
+#     Returns a frame indexed by (sorted) key, with columns
+#     (dummy, 'mean'); just as df.groupby(key).agg() would,
+#     after one_hot_encoder(). So it can be joined with
+#     aggregations of the numeric columns.
+#     where: boolean mask of rows to count (eg a recent
+#     window). Keys and dummies still come from all rows;
+#     keys with no row in 'where' get NaN.
+
+def category_means(df, key, columns = None, nan_as_category = True, where = None):
+    columns = categorical_columns(df, exclude = [key]) if columns is None else columns
+    groups, ids = pd.factorize(df[key], sort = True)
+    n_groups = len(ids)
+    weights = None if where is None else np.asarray(where, dtype = np.float64)
+    size = np.bincount(groups, weights = weights, minlength = n_groups).astype(np.float64)
+
+    names, blocks = [], []
+    for col in columns:
+        codes, categories = _codes(df[col])
+        n_codes = len(categories) + 1
+        counts = np.bincount(groups.astype(np.int64) * n_codes + codes,
+                             weights = weights,
+                             minlength = n_groups * n_codes
+                            ).reshape(n_groups, n_codes)
+        # 4.1 NaN (code 0) comes last, as in pd.get_dummies()
+        counts = counts[:, 1:] if not nan_as_category else np.roll(counts, -1, axis = 1)
+        names += _names(col, categories, nan_as_category)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            blocks.append(counts / size[:, None])
+
+    data = np.hstack(blocks) if blocks else np.empty((n_groups, 0))
+    return pd.DataFrame(data,
+                        index = pd.Index(ids, name = key),
+                        columns = pd.MultiIndex.from_tuples([(name, 'mean') for name in names])
+                                  if names else pd.MultiIndex.from_arrays([[], []])
+                       )
+
+
+# 5.0 Sparse columns of a frame
+
+def sparse_columns(df, exclude = ()):
+    return [col for col in df.columns
+            if isinstance(df[col].dtype, pd.SparseDtype) and col not in exclude]
+
+
+# 5.1 Aggregate sparse columns (with fill value 0) per
+#     group of 'key', as df.groupby(key).agg(stats) would.
+#     Only stored values are touched. The rest are zeros:
+#     they add nothing to 'sum' and their number is known.
+#     Returns a frame indexed by (sorted) key, with
+#     columns (column, stat).
+
+def sparse_group_agg(df, key, columns = None, stats = ('min', 'max', 'mean', 'sum', 'var')):
+    columns = sparse_columns(df, exclude = [key]) if columns is None else columns
+    groups, ids = pd.factorize(df[key], sort = True)
+    n_groups = len(ids)
+    size = np.bincount(groups, minlength = n_groups).astype(np.float64)
+
+    result = {}
+    for col in columns:
+        values = df[col].array
+        if values.fill_value not in (0, False):
+            raise ValueError("Sparse column with non-zero fill value: " + col)
+        rows = values.sp_index.to_int_index().indices
+        g = groups[rows]
+        v = values.sp_values.astype(np.float64)
+        s1 = np.bincount(g, weights = v, minlength = n_groups)
+        s2 = np.bincount(g, weights = v * v, minlength = n_groups)
+        stored = np.bincount(g, minlength = n_groups)
+        # 5.2 Min/max of stored values; a group with
+        #     any zero (not stored) value also has 0
+        lo = np.full(n_groups, np.inf)
+        hi = np.full(n_groups, -np.inf)
+        np.minimum.at(lo, g, v)
+        np.maximum.at(hi, g, v)
+        has_zero = stored < size
+        lo[has_zero] = np.minimum(lo[has_zero], 0)
+        hi[has_zero] = np.maximum(hi[has_zero], 0)
+
+        subtype = values.dtype.subtype
+        for stat in stats:
+            if stat == 'min':
+                out = lo.astype(subtype)
+            elif stat == 'max':
+                out = hi.astype(subtype)
+            elif stat == 'sum':
+                out = s1.astype(np.int64) if subtype.kind in 'biu' else s1
+            elif stat == 'mean':
+                out = s1 / size
+            elif stat == 'var':
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    out = (s2 - s1 * s1 / size) / (size - 1)
+                out[size < 2] = np.nan
+            else:
+                raise ValueError("Unsupported aggregation for sparse columns: " + stat)
+            result[(col, stat)] = out
+
+    return pd.DataFrame(result, index = pd.Index(ids, name = key))
+
+
+# 6.0 A frame as scipy CSR matrix (float32), say for
+#     lgb.Dataset(). Sparse columns go in as they are
+#     stored; of dense columns only non-zero values
+#     (NaN included) are stored.
+
+def to_csr(df):
+    if sp is None:
+        raise ImportError("scipy is needed for to_csr()")
+    rows, cols, data = [], [], []
+    for j, col in enumerate(df.columns):
+        values = df[col].array
+        if isinstance(values.dtype, pd.SparseDtype):
+            r, v = values.sp_index.to_int_index().indices, values.sp_values
+        else:
+            v = np.asarray(values, dtype = np.float32)
+            r = np.flatnonzero(v != 0)
+            v = v[r]
+        rows.append(r)
+        cols.append(np.full(len(r), j))
+        data.append(np.asarray(v, dtype = np.float32))
+    return sp.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                         shape = df.shape, dtype = np.float32)
+
+
+# 7.0 Where fitted vocabularies are saved
+vocabulary_folder = "vocabularies"
+
+
+# 7.1 A fitted vocabulary of 'object' (or 'category')
+#     columns: {column: [values in order]}.
+#     Dummies of a column, in order, are:
+#       <col>_<value> for every value in its vocabulary
+#       <col>_nan     (if nan_as_category)
+#       <col>_unseen  values not in vocabulary
+
+class VocabularyEncoder:
+
+    def __init__(self, vocabulary = None, nan_as_category = True):
+        self.vocabulary = vocabulary or {}
+        self.nan_as_category = nan_as_category
+
+
+    # 7.2 Learn vocabulary from one or more frames (eg train and test)
+    def fit(self, *frames):
+        for df in frames:
+            for col in categorical_columns(df):
+                _, categories = _codes(df[col])
+                known = self.vocabulary.get(col, [])
+                seen = set(known)
+                self.vocabulary[col] = known + [v for v in categories if v not in seen]
+        return self
+
+
+    # 7.3 Names of dummy columns of one column
+    def dummy_columns(self, col):
+        names = _names(col, self.vocabulary[col], self.nan_as_category)
+        return names + [f"{col}_unseen"]
+
+
+    # 7.4 Codes of one column as per vocabulary:
+    #       0 .. V-1 values, V NaN, V + 1 unseen
+    def codes(self, s):
+        index = pd.Index(self.vocabulary[s.name])
+        n = len(index)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # 7.4.1 Look up only the categories, then
+            #       map row codes through them
+            lookup = index.get_indexer(s.cat.categories)
+            lookup = np.where(lookup < 0, n + 1, lookup)
+            row_codes = s.cat.codes.to_numpy()
+            codes = np.where(row_codes < 0, n, lookup[row_codes])
+        else:
+            codes = index.get_indexer(s)
+            codes = np.where(codes >= 0, codes, np.where(s.isna().to_numpy(), n, n + 1))
+        return codes
+
+
+    # 7.5 Replace vocabulary columns of a frame by their
+    #     dummies. Same layout as one_hot_encoder():
+    #     dummies come after the other columns.
+    #     Returns transformed-data and new-columns created
+    def transform(self, df, sparse = False):
+        blocks, new_columns = [], []
+        for col in self.vocabulary:
+            names = self.dummy_columns(col)
+            n = len(self.vocabulary[col])
+            codes = self.codes(df[col])
+            if not self.nan_as_category:
+                # 7.5.1 NaN: no dummy is set; unseen moves down one
+                codes = np.where(codes == n, -1, np.where(codes == n + 1, n, codes))
+            dummies = pd.get_dummies(pd.Categorical.from_codes(codes, categories = range(len(names))),
+                                     sparse = sparse)
+            dummies.columns = names
+            dummies.index = df.index
+            blocks.append(dummies)
+            new_columns += names
+        df = pd.concat([df.drop(columns = list(self.vocabulary))] + blocks, axis = 1)
+        return df, new_columns
+
+
+    # 7.6 Save/load
+    def save(self, filename):
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok = True)
+        vocabulary = {col: [v.item() if hasattr(v, 'item') else v for v in values]
+                      for col, values in self.vocabulary.items()}
+        with open(filename, 'w') as f:
+            json.dump({'nan_as_category': self.nan_as_category,
+                       'vocabulary':      vocabulary}, f, indent = 1)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            saved = json.load(f)
+        return cls(saved['vocabulary'], saved['nan_as_category'])
+
+
+# 8.0 Dummies of a frame as per the saved vocabulary 'name'
+#     (fitted on this frame and saved on first use).
+#     Drop-in for one_hot_encoder().
+
+def encode(df, name, nan_as_category = True, sparse = False, folder = None):
+    folder = vocabulary_folder if folder is None else folder
+    filename = os.path.join(folder, name + '.json')
+    if os.path.exists(filename):
+        encoder = VocabularyEncoder.load(filename)
+    else:
+        encoder = VocabularyEncoder(nan_as_category = nan_as_category).fit(df)
+        encoder.save(filename)
+    return encoder.transform(df, sparse = sparse)
@@ -0,0 +1,565 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Feature specs, in one declarative file, compiled into
+#           an aggregation plan.
+#
+#           Every stage notebook hard-coded its aggregation
+#           dictionaries, its 'PREFIX_COL_STAT' renames and its
+#           COUNT column. All of these now live in feature_specs.json,
+#           one entry per aggregated frame (a 'stage'):
+#             table, key, prefix:  what is aggregated, over which
+#                                  ID, and how columns are named
+#             aggregations:        {column: [stats]}; or one list of
+#                                  stats for all columns read
+#             derived:             features computed in the notebook
+#                                  and the raw columns they need
+#             expressions:         {feature: expression}; derived
+#                                  features evaluated by expressions.py.
+#                                  Columns they need are found from
+#                                  them (so need not be in 'derived')
+#             category_means:      mean of every dummy (see onehot.py)
+#             joined_aggregations: {glob pattern: [stats]} for columns
+#                                  of child stages (see children)
+#             where:               {column: value}: only such rows
+#             children:            {child stage: child key}; eg bureau
+#                                  rows link to bb_agg by SK_ID_BUREAU
+#             like:                take aggregations (derived,
+#                                  expressions and children) of
+#                                  another stage
+#             windows:             {'on': time column, 'latest': its
+#                                  freshest value, 'last': [n, ...]}:
+#                                  same stats over the last n values of
+#                                  'on' too, ie rows with
+#                                  latest - n < on <= latest; only if
+#                                  execute(windows = True). 'latest' is
+#                                  0 in bureau_balance and -1 (the
+#                                  default) in the other tables; so the
+#                                  last 3 months are 3 months everywhere
+#             loans:               a stage over the same table, keyed
+#                                  by SK_ID_PREV; its states per loan
+#                                  also give this stage (see loans.py)
+#             stat_expressions,    of a loan stage: expressions over its
+#             rolled_up:           stats; and {glob pattern: [stats]}
+#                                  of its features over a client's loans
+#             count, also, exclude
+#
+#           The planner then:
+#             i)   removes duplicate stats. Stages over the same rows
+#                  (same table, key and 'where') share every stat
+#            ii)   sorts a table only once for all stages keyed by the
+#                  same ID; eg bureau, bureau_active and bureau_closed.
+#                  Each column is gathered once for all of them
+#           iii)   aggregates columns of a child stage (eg bb_agg) up
+#                  through the child key; the child is never joined
+#            iv)   prunes: only columns some spec needs are read
+#             v)   reports rows, bytes read and reductions planned
+#                  before anything is read
+#            vi)   evaluates all windows of a stage over one sort by
+#                  (key, time); see segments.py
+#
+# Usage:
+#           import planner
+#           plan = planner.Plan(planner.load_specs(), ['pos'])
+#           plan.report()
+#           pos = caching.read_csv_cached('POS_CASH_balance.csv.zip',
+#                                         usecols = plan.usecols('pos_cash_balance'))
+#           pos_agg = plan.execute('pos_cash_balance', pos)['pos']
+#
+#           Check of execute() (windows too) against groupby().agg() on a
+#           synthetic table (see expected()); from command line:
+#           python planner.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import fnmatch
+import numpy as np
+import pandas as pd
+
+# 1.1 Helper modules in this folder
+import caching
+import schemas
+import projection
+import segments
+import onehot
+import expressions
+
+
+# 2.0 Specs are kept along with the code
+spec_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_specs.json")
+
+
+# 3.0 Load specs: {stage: spec}
+
+def load_specs(filename = None):
+    with open(spec_file if filename is None else filename) as f:
+        return json.load(f)
+
+
+# 3.1 Stats in order, each only once. A list of stats
+#     (for all columns) stays a list.
+
+def dedup(aggregations):
+    if not isinstance(aggregations, dict):
+        return list(dict.fromkeys(aggregations))
+    return {col: list(dict.fromkeys([stats] if isinstance(stats, str) else stats))
+            for col, stats in aggregations.items()}
+
+
+# 3.2 Boolean mask of rows of df that meet 'where'.
+#     A list of values means any of them.
+
+def where_mask(df, where):
+    mask = np.ones(len(df), dtype = bool)
+    for col, value in where.items():
+        if isinstance(value, list):
+            mask &= df[col].isin(value).to_numpy()
+        else:
+            mask &= (df[col] == value).to_numpy()
+    return mask
+
+
+# 4.0 A compiled plan
+
+class Plan:
+
+    def __init__(self, specs, stages = None):
+        stages = list(specs) if stages is None else stages
+        self.specs = specs
+        self.stages = {name: self._resolve(specs, name) for name in stages}
+        # 4.1 Stages of the same table and key share one sort
+        self.groups = {}
+        for name, spec in self.stages.items():
+            self.groups.setdefault((spec['table'], spec['key']), []).append(name)
+
+
+    # 4.2 Fill in a stage's spec from the stage it is 'like'
+    @staticmethod
+    def _resolve(specs, name):
+        spec = dict(specs[name])
+        if 'like' in spec:
+            base = specs[spec['like']]
+            spec.setdefault('aggregations', base.get('aggregations', {}))
+            spec.setdefault('derived', base.get('derived', {}))
+            spec.setdefault('expressions', base.get('expressions', {}))
+            spec.setdefault('children', base.get('children', {}))
+        spec['aggregations'] = dedup(spec.get('aggregations', {}))
+        if spec.get('where') and spec.get('category_means'):
+            raise ValueError("Stage " + name + ": category_means over a 'where' subset is not supported")
+        if spec.get('where') and spec.get('windows'):
+            raise ValueError("Stage " + name + ": windows over a 'where' subset are not supported")
+        spec['joined_aggregations'] = dedup(spec.get('joined_aggregations', {}))
+        for field, default in (('prefix', ''), ('derived', {}), ('expressions', {}), ('where', {}),
+                               ('children', {}), ('also', []), ('exclude', []), ('category_means', False),
+                               ('count', None), ('windows', None), ('loans', None),
+                               ('stat_expressions', {}), ('rolled_up', {})):
+            spec.setdefault(field, default)
+        # 4.2.1 Names an expression uses are what it is derived from
+        spec['derived'] = dict({feature: expressions.columns(text)
+                                for feature, text in spec['expressions'].items()}, **spec['derived'])
+        return spec
+
+
+    # 4.3 Stages over a table
+    def stages_of(self, table):
+        return [name for name, spec in self.stages.items() if spec['table'] == table]
+
+
+    # 5.0 Raw columns of a table that must be read
+    #     for all its stages (in file order). Columns
+    #     of child stages are not read; child keys are.
+
+    def usecols(self, table):
+        needed = []
+        for name in self.stages_of(table):
+            spec = self.stages[name]
+            if isinstance(spec['aggregations'], dict):
+                from_children = [c for child in spec['children'] for c in self.outputs(child)]
+                cols = projection.needed_columns(
+                                                 {c: s for c, s in spec['aggregations'].items()
+                                                  if c not in from_children},
+                                                 keys = [spec['key']] + list(spec['children'].values()),
+                                                 cat_columns = schemas.categorical_columns(table)
+                                                               if spec['category_means'] else (),
+                                                 derived = spec['derived'],
+                                                 also = list(spec['also']) + list(spec['where']) +
+                                                        ([spec['windows']['on']] if spec['windows'] else [])
+                                                )
+            else:
+                cols = [c for c in schemas.columns(table) if c not in spec['exclude']]
+            needed += [c for c in cols if c not in needed]
+        return [c for c in schemas.columns(table) if c in needed]
+
+
+    # 5.0.1 Named (non dummy) columns that a stage gives
+    def outputs(self, name):
+        spec = self._resolve(self.specs, name)
+        if not isinstance(spec['aggregations'], dict):
+            return []
+        return [spec['prefix'] + col + "_" + stat.upper()
+                for col, stats in spec['aggregations'].items() for stat in stats]
+
+
+    # 5.1 Requests for segments.Segments.reduce(): one per
+    #     distinct 'where' of a group, with the union of
+    #     stats asked for by its stages.
+    #     Returns ({request: (where, aggregations)}, {stage: request})
+
+    def requests(self, table, key, columns = None):
+        requests, of_stage = {}, {}
+        for name in self.groups[(table, key)]:
+            spec = self.stages[name]
+            request = json.dumps(spec['where'], sort_keys = True)
+            where, merged = requests.setdefault(request, (spec['where'], {}))
+            for col, stats in self._aggregations(spec, columns).items():
+                merged[col] = merged.get(col, []) + [s for s in stats if s not in merged.get(col, [])]
+            of_stage[name] = request
+        return requests, of_stage
+
+
+    # 5.2 {column: [stats]} of a stage. A list of stats is
+    #     for all columns; glob patterns of joined columns
+    #     are matched against columns of the frame (if known)
+
+    def _own(self, spec, columns = None):
+        aggregations = spec['aggregations']
+        if isinstance(aggregations, dict):
+            return dict(aggregations)
+        if columns is None:
+            columns = schemas.columns(spec['table'])
+        return {c: aggregations for c in columns if c != spec['key'] and c not in spec['exclude']}
+
+    def _joined(self, spec, columns = None):
+        own = self._own(spec, columns)
+        joined = {}
+        for pattern, stats in spec['joined_aggregations'].items():
+            for col in fnmatch.filter(columns or [], pattern):
+                if col not in own:
+                    joined.setdefault(col, stats)
+        return joined
+
+    def _aggregations(self, spec, columns = None):
+        return dict(self._own(spec, columns), **self._joined(spec, columns))
+
+
+    # 5.3 {column: [stats]} over windows of a stage. Unless
+    #     given in its 'windows', the stage's own stats but
+    #     for nunique (see segments.Segments.reduce_windows)
+
+    def _windowed(self, spec, columns = None):
+        aggregations = spec['windows'].get('aggregations')
+        if aggregations is None:
+            aggregations = {c: [s for s in stats if s != 'nunique']
+                            for c, stats in self._own(spec, columns).items()}
+        return {c: stats for c, stats in dedup(aggregations).items()
+                if stats and (columns is None or c in columns)}
+
+
+    # 6.0 Planned cost, before anything is read. Per stage:
+    #     rows:           rows of its table (from cache; else
+    #                     as given in 'rows' = {table: rows})
+    #     columns_read:   after pruning (see 5.0)
+    #     read_mb:        bytes of those columns (schema dtypes)
+    #     sorts:          1 for the first stage of a group;
+    #                     others reuse its sort
+    #     stats_asked:    (column, stat) pairs in the spec
+    #     stats_computed: after removing those computed for an
+    #                     earlier stage over the same rows
+    #     row_ops_m:      millions of row visits: sort plus
+    #                     one pass per stat computed
+    #     Tables read once are charged to their first stage.
+
+    def report(self, rows = None):
+        rows = rows or {}
+        out, charged = [], set()
+        for (table, key), names in self.groups.items():
+            n = rows.get(table, _table_rows(table))
+            usecols = self.usecols(table)
+            done = {}
+            for i, name in enumerate(names):
+                spec = self.stages[name]
+                asked = self._aggregations(spec)
+                request = json.dumps(spec['where'], sort_keys = True)
+                seen = done.setdefault(request, set())
+                pairs = [(c, s) for c, stats in asked.items() for s in stats]
+                new = [p for p in pairs if p not in seen]
+                seen.update(new)
+                first_read = table not in charged
+                charged.add(table)
+                sort_ops = n * np.log2(max(n, 2)) if (i == 0 and n == n) else 0
+                out.append({
+                            'stage':          name,
+                            'table':          table,
+                            'key':            key,
+                            'rows':           n,
+                            'columns_read':   len(usecols) if first_read else 0,
+                            'read_mb':        n * _row_bytes(table, usecols) / 2**20 if first_read else 0,
+                            'sorts':          1 if i == 0 else 0,
+                            'stats_asked':    len(pairs),
+                            'stats_computed': len(new),
+                            'row_ops_m':      (sort_ops + n * len(new)) / 1e6
+                           })
+        report = pd.DataFrame(out).set_index('stage')
+        report.loc['TOTAL', ['read_mb', 'sorts', 'stats_asked', 'stats_computed', 'row_ops_m']] = \
+            report[['read_mb', 'sorts', 'stats_asked', 'stats_computed', 'row_ops_m']].sum()
+        return report
+
+
+    # 7.0 Run all stages over a table. df has the columns read
+    #     (plus derived ones). children: {child stage: its
+    #     frame}, eg {'bureau_balance': bb_agg}. Returns
+    #     {stage: frame}, indexed by key, with columns named
+    #     as in the specs. windows: also aggregate over the
+    #     'windows' of stages, as 'PREFIX_LASTn_COL_STAT'.
+    #     client_index: offsets of rows of df per key (see
+    #     clientindex.py); segments of its key are built
+    #     from them, with no sort of keys.
+
+    def execute(self, table, df, backend = None, nan_as_category = True, children = None, windows = False,
+                client_index = None):
+        children = children or {}
+        frames = {}
+        for (tbl, key), names in self.groups.items():
+            if tbl != table:
+                continue
+            # 7.0.1 All windows of a group share one sort by (key, time)
+            on = {self.stages[name]['windows']['on'] for name in names
+                  if windows and self.stages[name]['windows']}
+            if len(on) > 1:
+                raise ValueError("Stages over " + table + " have windows on different columns: " +
+                                 ", ".join(sorted(on)))
+            within = df[on.pop()] if on else None
+            if client_index is not None and client_index.key == key:
+                if client_index.offsets[-1] != len(df):
+                    raise ValueError("client_index is not of the rows of df")
+                seg = segments.Segments.from_offsets(client_index.ids, client_index.offsets, key, backend,
+                                                     within = within)
+            else:
+                seg = segments.Segments(df[key], backend, within = within)
+            index = pd.Index(seg.ids, name = key)
+            # 7.1 Sparse dummies (see onehot.py) are aggregated apart
+            sparse = onehot.sparse_columns(df, exclude = [key])
+            dense = [c for c in df.columns if c not in sparse]
+            # 7.1.1 Columns that come from child stages
+            linked = {}
+            for name in names:
+                for child, on in self.stages[name]['children'].items():
+                    for c in children[child].columns if child in children else []:
+                        if c not in dense:
+                            linked.setdefault(c, (child, on))
+            columns = dense + list(linked)
+            requests, of_stage = self.requests(table, key, columns)
+            masks = {request: None if not where else seg.gather(where_mask(df, where))
+                     for request, (where, _) in requests.items()}
+            results = seg.reduce(df, {request: (masks[request], {c: s for c, s in aggregations.items()
+                                                                 if c not in linked})
+                                      for request, (_, aggregations) in requests.items()})
+            for child, on in dict(linked.values()).items():
+                up = seg.reduce_children(children[child], df[on],
+                                         {request: (masks[request], {c: s for c, s in aggregations.items()
+                                                                     if linked.get(c, (None,))[0] == child})
+                                          for request, (_, aggregations) in requests.items()})
+                for request, result in up.items():
+                    results[request].update(result)
+
+            for name in names:
+                spec = self.stages[name]
+                result = results[of_stage[name]]
+                prefix = spec['prefix']
+                blocks = [_frame(result, self._own(spec, columns), prefix, index)]
+                if sparse and not isinstance(spec['aggregations'], dict):
+                    blocks.append(_named(onehot.sparse_group_agg(df, key, sparse, spec['aggregations']), prefix))
+                if spec['category_means']:
+                    blocks.append(_named(onehot.category_means(df, key, nan_as_category = nan_as_category), prefix))
+                joined = self._joined(spec, columns)
+                if joined:
+                    blocks.append(_frame(result, joined, prefix, index))
+                agg = pd.concat(blocks, axis = 1) if len(blocks) > 1 else blocks[0]
+                if spec['count']:
+                    agg[spec['count']] = seg.size.astype(np.int64)
+                if windows and spec['windows']:
+                    agg = pd.concat([agg, _windows(seg, df, spec, self._windowed(spec, dense), key,
+                                                   index, nan_as_category)], axis = 1)
+                # 7.2 As with groupby() over a subset, keys
+                #     without any such row are left out
+                if spec['where']:
+                    agg = agg[seg.sum(masks[of_stage[name]].astype(np.int64)) > 0]
+                frames[name] = agg
+        return frames
+
+
+# 7.3 Windows of a stage: {'PREFIX_LASTn_': lowest value
+#     of 'on' in the window}. See 'windows' above
+
+def window_bounds(spec):
+    latest = spec['windows'].get('latest', -1)
+    return {spec['prefix'] + "LAST" + str(n) + "_": latest - n + 1 for n in spec['windows']['last']}
+
+
+# 7.4 Stats over windows of a stage (see segments.py),
+#     plus means of dummies over the same rows
+
+def _windows(seg, df, spec, aggregations, key, index, nan_as_category):
+    on = spec['windows']['on']
+    bounds = window_bounds(spec)
+    results = seg.reduce_windows(df, aggregations, bounds)
+    blocks = []
+    for name, bound in bounds.items():
+        blocks.append(_frame(results[name], aggregations, name, index))
+        if spec['category_means']:
+            blocks.append(_named(onehot.category_means(df, key, nan_as_category = nan_as_category,
+                                                       where = (df[on] >= bound).to_numpy()), name))
+    return pd.concat(blocks, axis = 1)
+
+
+# 8.0 Rows of a raw table, as noted when it was cached
+
+def _table_rows(table):
+    n = 0
+    for filename in schemas.tables[table][0]:
+        _, meta_file = caching.cache_paths(filename)
+        if not os.path.exists(meta_file):
+            return np.nan
+        with open(meta_file) as f:
+            n += json.load(f)['shape'][0]
+    return n
+
+
+# 8.1 Bytes per row of some columns, as per schema dtypes.
+#     Categoricals are held as int8/int16 codes.
+
+def _row_bytes(table, columns):
+    schema = schemas.load_schema(table)
+    size = 0
+    for col in columns:
+        dtype = schema[col]['dtype']
+        if dtype == 'category':
+            size += 1 if len(schema[col].get('categories', [])) < 127 else 2
+        else:
+            size += np.dtype(dtype).itemsize
+    return size
+
+
+# 8.2 Stats of some columns (from Segments.reduce())
+#     as a frame with columns 'PREFIX_COL_STAT'
+
+def _frame(result, aggregations, prefix, index):
+    return pd.DataFrame({prefix + col + "_" + stat.upper(): result[(col, stat)]
+                         for col, stats in aggregations.items() for stat in stats},
+                        index = index)
+
+
+# 8.3 (column, stat) columns to 'PREFIX_COL_STAT'
+
+def _named(agg, prefix):
+    agg.columns = pd.Index([prefix + col + "_" + stat.upper() for col, stat in agg.columns])
+    return agg
+
+
+# 9.0 Specs of a synthetic table (see segments.synthetic()),
+#     for checks: a child stage per SK_ID_PREV, a stage per
+#     client that aggregates it up (and has windows), and a
+#     'where' stage
+
+synthetic_specs = {
+                   'synthetic_prev': {
+                                      'table': 'synthetic', 'key': 'SK_ID_PREV', 'prefix': 'PREV_',
+                                      'aggregations': {'AMT_BALANCE': ['mean', 'max'], 'SK_DPD': ['max']}
+                                     },
+                   'synthetic':      {
+                                      'table': 'synthetic', 'key': 'SK_ID_CURR', 'prefix': 'SYN_',
+                                      'aggregations': {'MONTHS_BALANCE': ['min', 'max', 'size'],
+                                                       'AMT_BALANCE': ['min', 'max', 'mean', 'sum', 'var',
+                                                                       'nunique'],
+                                                       'SK_DPD': ['max', 'mean', 'sum']},
+                                      'category_means': True, 'count': 'SYN_COUNT',
+                                      'children': {'synthetic_prev': 'SK_ID_PREV'},
+                                      'joined_aggregations': {'PREV_*': ['mean', 'max']},
+                                      'windows': {'on': 'MONTHS_BALANCE', 'latest': -1, 'last': [3, 12]}
+                                     },
+                   'synthetic_late': {
+                                      'like': 'synthetic', 'table': 'synthetic', 'key': 'SK_ID_CURR',
+                                      'prefix': 'SYN_LATE_', 'where': {'STATUS': ['B', 'C']}
+                                     }
+                  }
+
+
+# 9.1 What execute() should give, the plain pandas way:
+#     children left-joined, one-hot dummies and
+#     groupby().agg() per stage. Windows are the rows with
+#     latest - n < on <= latest, as the specs say; not as
+#     window_bounds() makes them. Only for stages with
+#     {column: [stats]} aggregations.
+
+def expected(plan, table, df, children = None, windows = False, nan_as_category = True):
+    children = children or {}
+    frames = {}
+    for name in plan.stages_of(table):
+        spec = plan.stages[name]
+        if not isinstance(spec['aggregations'], dict):
+            raise ValueError("Stage " + name + ": only {column: [stats]} aggregations are checked")
+        key, prefix = spec['key'], spec['prefix']
+        rows = df
+        for child, on in spec['children'].items():
+            if child in children:
+                rows = rows.join(children[child], on = on)
+        if spec['where']:
+            rows = rows[where_mask(rows, spec['where'])]
+        # 9.1.1 pandas reduces float32 in float32; eg var over
+        #       a few rows loses digits. execute() does not
+        rows = rows.astype({c: np.float64 for c in rows.columns if rows[c].dtype == np.float32})
+        aggregations = dict(plan._own(spec), **plan._joined(spec, list(rows.columns)))
+        agg = _named(rows.groupby(key).agg(aggregations), prefix)
+        dummies = pd.get_dummies(rows[onehot.categorical_columns(df, exclude = [key])],
+                                 dummy_na = nan_as_category, dtype = np.float64)
+        if spec['category_means']:
+            means = dummies.groupby(rows[key]).mean()
+            agg[[prefix + c + "_MEAN" for c in means.columns]] = means.to_numpy()
+        if spec['count']:
+            agg[spec['count']] = rows.groupby(key).size()
+        if windows and spec['windows']:
+            on, latest = spec['windows']['on'], spec['windows'].get('latest', -1)
+            blocks = [agg]
+            for n in spec['windows']['last']:
+                inside = ((rows[on] > latest - n) & (rows[on] <= latest)).to_numpy()
+                window = prefix + "LAST" + str(n) + "_"
+                blocks.append(_named(rows[inside].groupby(key).agg(plan._windowed(spec, list(df.columns))),
+                                     window).reindex(agg.index))
+                if spec['category_means']:
+                    means = dummies[inside].groupby(rows[key][inside]).mean().reindex(agg.index)
+                    means.columns = [window + c + "_MEAN" for c in means.columns]
+                    blocks.append(means)
+            agg = pd.concat(blocks, axis = 1)
+        frames[name] = agg
+    return frames
+
+
+# 9.2 Self-check: execute() (with windows) against
+#     expected() on segments.synthetic(), per backend. Returns, per
+#     stage, the columns that differ (none if all is
+#     well). From command line: python planner.py
+
+def check(df = None):
+    df = segments.synthetic() if df is None else df
+    child_plan = Plan(synthetic_specs, ['synthetic_prev'])
+    plan = Plan(synthetic_specs, ['synthetic', 'synthetic_late'])
+    rows = []
+    for backend in ('numpy', 'numba'):
+        got = child_plan.execute('synthetic', df, backend = backend)
+        # 9.2.1 Every other SK_ID_PREV has a child row
+        children = {'synthetic_prev': got['synthetic_prev'].iloc[::2]}
+        got.update(plan.execute('synthetic', df, backend = backend, children = children, windows = True))
+        want = dict(expected(child_plan, 'synthetic', df),
+                    **expected(plan, 'synthetic', df, children, windows = True))
+        for name, frame in want.items():
+            rows.append({'stage': name, 'backend': backend, 'columns': frame.shape[1],
+                         'differ': ", ".join(segments.mismatched(got[name], frame))})
+    return pd.DataFrame(rows).set_index(['stage', 'backend'])
+
+
+if __name__ == '__main__':
+    print(check())
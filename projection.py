@@ -0,0 +1,70 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Column projection: read only those columns of a raw
+#           table that its aggregations really use.
+#
+#           Example: pos_cash_balance.ipynb aggregates only
+#           MONTHS_BALANCE, SK_DPD, SK_DPD_DEF and dummies of
+#           NAME_CONTRACT_STATUS. SK_ID_PREV, CNT_INSTALMENT and
+#           CNT_INSTALMENT_FUTURE are never used; so they need
+#           not be parsed or held in memory.
+#
+#           From the aggregation dictionary of a stage (and from
+#           definitions of features derived from raw columns), we
+#           work back to the raw columns needed. This list is
+#           then passed as 'usecols' to the reader.
+#
+# Usage:
+#           import projection
+#           usecols = projection.needed_columns(
+#                                               aggregations,
+#                                               keys = ['SK_ID_CURR'],
+#                                               cat_columns = ['NAME_CONTRACT_STATUS']
+#                                              )
+#           pos = caching.read_csv_cached('POS_CASH_balance.csv.zip', usecols = usecols)
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+
+# 1.0 Raw column(s) behind one aggregated column.
+#     i)   derived:     {new feature: [columns it is computed from]}
+#                       Columns it is computed from may themselves be
+#                       derived. An empty list means that the feature
+#                       comes from elsewhere (eg from a joined table).
+#    ii)   cat_columns: 'object' columns that are OneHotEncoded.
+#                       A dummy such as 'NAME_CONTRACT_STATUS_Active'
+#                       needs raw column 'NAME_CONTRACT_STATUS'.
+
+def source_columns(name, cat_columns = (), derived = None):
+    derived = derived or {}
+    if name in derived:
+        sources = []
+        for col in derived[name]:
+            for c in source_columns(col, cat_columns, derived):
+                if c not in sources:
+                    sources.append(c)
+        return sources
+    for cat in cat_columns:
+        if name == cat or name.startswith(cat + '_'):
+            return [cat]
+    return [name]
+
+
+# 2.0 All raw columns that a stage needs.
+#     i)   aggregations: dictionary passed on to groupby().agg()
+#    ii)   keys:         grouping/joining keys
+#   iii)   cat_columns:  'object' columns whose dummies are aggregated
+#                        (or used to filter rows)
+#    iv)   derived:      as in source_columns()
+#     v)   also:         any other column used by the stage
+
+def needed_columns(aggregations, keys = ('SK_ID_CURR',), cat_columns = (), derived = None, also = ()):
+    needed = list(keys)
+    names = list(aggregations) + list(cat_columns) + list(also)
+    for name in names:
+        for col in source_columns(name, cat_columns, derived):
+            if col not in needed:
+                needed.append(col)
+    return needed
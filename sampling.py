@@ -0,0 +1,103 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Client-consistent sampling of all tables.
+#
+#           With num_rows = N every notebook reads the first N rows
+#           of its table. Clients in those rows of one table have
+#           little to do with clients in the first N rows of
+#           another. After the joins on SK_ID_CURR (in
+#           join_all_processed.ipynb) most features are NaN.
+#
+#           Instead, a client is kept if a (deterministic) hash of
+#           its SK_ID_CURR falls below the sampling fraction. The
+#           same clients are therefore kept in every table and in
+#           every run. Tables without SK_ID_CURR (bureau_balance)
+#           are sampled on their parent key: rows are kept whose
+#           SK_ID_BUREAU belongs to a sampled bureau row.
+#
+# Usage:
+#           import sampling
+#           pos = sampling.read_csv_sampled('POS_CASH_balance.csv.zip', fraction = 0.01)
+#           bb  = sampling.read_csv_sampled('bureau_balance.csv.zip',
+#                                           key = 'SK_ID_BUREAU',
+#                                           parent_ids = bureau['SK_ID_BUREAU'])
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import numpy as np
+import pandas as pd
+
+# 1.1 Raw files are read through the cache
+import caching
+
+
+# 2.0 A deterministic hash of integer IDs mapped
+#     to [0, 1). (splitmix64 finalizer. Python's own
+#     hash() is randomized per process; so not used)
+
+def hash_fraction(ids, salt = 0):
+    x = np.asarray(ids).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15) + np.uint64(salt)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / 2.0**53
+
+
+# 2.1 Which IDs are in a sample of given fraction.
+#     A 1% sample is contained in a 10% sample.
+
+def in_sample(ids, fraction, salt = 0):
+    return hash_fraction(ids, salt) < fraction
+
+
+# 3.0 Rows of a frame that belong to the sample
+#     i)   fraction:   keep rows whose key hashes below fraction
+#    ii)   parent_ids: or, keep rows whose key is among these
+
+def sample_frame(df, fraction = None, key = 'SK_ID_CURR', parent_ids = None):
+    if parent_ids is not None:
+        mask = df[key].isin(parent_ids).values
+    elif fraction is not None:
+        mask = in_sample(df[key].values, fraction)
+    else:
+        return df
+    return df[mask].reset_index(drop = True)
+
+
+# 4.0 Read a raw file, keeping only sampled rows.
+#     With neither fraction nor parent_ids, this is
+#     just caching.read_csv_cached().
+#     Rows are filtered on the (memory-mapped) cached
+#     table, before any conversion to pandas. So only
+#     sampled rows are ever held in memory.
+
+def read_csv_sampled(filename, fraction = None, key = 'SK_ID_CURR', parent_ids = None,
+                     nrows = None, usecols = None, folder = None, **read_options):
+    if fraction is None and parent_ids is None:
+        return caching.read_csv_cached(filename, nrows = nrows, usecols = usecols,
+                                       folder = folder, **read_options)
+    columns = None if usecols is None else list(usecols) + ([key] if key not in usecols else [])
+
+    # 4.1 Without pyarrow: filter chunk by chunk
+    if caching.feather is None:
+        chunks = pd.read_csv(filename, usecols = columns, chunksize = 1000000, **read_options)
+        df = pd.concat([sample_frame(chunk, fraction, key, parent_ids) for chunk in chunks],
+                       ignore_index = True)
+    else:
+        data_file, _ = caching.ensure_cache(filename, folder, **read_options)
+        table = caching.feather.read_table(data_file, memory_map = True)
+        if columns is not None:
+            table = table.select([c for c in table.column_names if c in columns])
+        keys = table.column(key).to_numpy()
+        if parent_ids is not None:
+            mask = np.isin(keys, np.asarray(parent_ids))
+        else:
+            mask = in_sample(keys, fraction)
+        df = table.filter(caching.pa.array(mask)).to_pandas()
+
+    if usecols is not None and key not in usecols:
+        df = df.drop(columns = [key])
+    return df if nrows is None else df.iloc[:nrows].copy()
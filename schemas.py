@@ -0,0 +1,163 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           A per-table registry of dtypes to use while reading.
+#
+#           Every stage read its file with default int64/float64/object
+#           dtypes and then shrank the frame with reducing.Reducer().
+#           So the full width frame had to exist once before being
+#           reduced. Here we record, once, for every table:
+#             i)   its columns (from HomeCredit_columns_description.csv)
+#            ii)   observed min/max/NaN of every column
+#           From these the narrowest safe dtype of each column is
+#           decided. pd.read_csv() is then given these dtypes and
+#           parses straight into int8/int16/.../float32/category.
+#           An 'object' column becomes a categorical whose dictionary
+#           (categories) is the same in every file of the table; so
+#           application_train and application_test share it.
+#
+# Usage:
+#           import schemas
+#           bureau = pd.read_csv('bureau.csv.zip', dtype = schemas.read_dtypes('bureau'))
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+# 2.0 Tables, their raw files and their name
+#     in HomeCredit_columns_description.csv
+tables = {
+          'application':           (['application_train.csv.zip', 'application_test.csv.zip'],
+                                    'application_{train|test}.csv'),
+          'bureau':                (['bureau.csv.zip'],                'bureau.csv'),
+          'bureau_balance':        (['bureau_balance.csv.zip'],        'bureau_balance.csv'),
+          'previous_application':  (['previous_application.csv.zip'],  'previous_application.csv'),
+          'pos_cash_balance':      (['POS_CASH_balance.csv.zip'],      'POS_CASH_balance.csv'),
+          'installments_payments': (['installments_payments.csv.zip'], 'installments_payments.csv'),
+          'credit_card_balance':   (['credit_card_balance.csv.zip'],   'credit_card_balance.csv'),
+         }
+
+# 2.1 Files
+description_file = "HomeCredit_columns_description.csv"
+schema_folder = "schemas"
+
+
+# 3.0 Column descriptions of a table as {column: description}
+
+def describe_table(table, filename = description_file):
+    desc = pd.read_csv(filename, encoding = 'unicode_escape')
+    desc = desc[desc['Table'] == tables[table][1]]
+    return dict(zip(desc['Row'], desc['Description']))
+
+
+# 3.1 One pass (chunk by chunk) over the raw file(s) of a table.
+#     For every column we note min, max, whether there are NaNs
+#     and whether all values are whole numbers. For 'object'
+#     columns we note all (sorted) values.
+
+def observe(filenames, chunksize = 1000000):
+    stats = {}
+    for filename in filenames:
+        for chunk in pd.read_csv(filename, chunksize = chunksize):
+            for col in chunk.columns:
+                s = stats.setdefault(col, {'kind': 'int', 'min': None, 'max': None, 'nan': False})
+                values = chunk[col]
+                s['nan'] = s['nan'] or bool(values.isnull().any())
+                if values.dtype == 'object' or s['kind'] == 'object':
+                    s['kind'] = 'object'
+                    s['categories'] = sorted(set(s.get('categories', [])) |
+                                             set(values.dropna().astype(str).unique()))
+                    continue
+                values = values.dropna()
+                if len(values) == 0:
+                    continue
+                if s['kind'] == 'int' and not np.array_equal(values, np.round(values)):
+                    s['kind'] = 'float'
+                lo, hi = float(values.min()), float(values.max())
+                s['min'] = lo if s['min'] is None else min(s['min'], lo)
+                s['max'] = hi if s['max'] is None else max(s['max'], hi)
+    return stats
+
+
+# 3.2 Narrowest safe dtype for a column with given stats.
+#     i)   'object'                      -->  category
+#    ii)   whole numbers, no NaN         -->  smallest int that holds [min, max]
+#   iii)   whole numbers with NaN, and
+#          other numbers                 -->  float32 (float64 if whole numbers
+#                                             with NaN can not be exactly held
+#                                             in float32, eg IDs > 2**24)
+
+def narrowest_dtype(s):
+    if s['kind'] == 'object':
+        return 'category'
+    if s['min'] is None:
+        return 'float32'
+    if s['kind'] == 'int' and not s['nan']:
+        for t in ('int8', 'int16', 'int32', 'int64'):
+            info = np.iinfo(t)
+            if info.min <= s['min'] and s['max'] <= info.max:
+                return t
+    if s['kind'] == 'int' and max(abs(s['min']), abs(s['max'])) > 2**24:
+        return 'float64'
+    return 'float32'
+
+
+# 4.0 Build (and save) schema of one table
+
+def build_schema(table, folder = None):
+    folder = schema_folder if folder is None else folder
+    filenames = tables[table][0]
+    stats = observe(filenames)
+    described = describe_table(table) if os.path.exists(description_file) else {}
+    schema = {}
+    for col, s in stats.items():
+        schema[col] = dict(s, dtype = narrowest_dtype(s), description = described.get(col))
+    os.makedirs(folder, exist_ok = True)
+    with open(os.path.join(folder, table + '.json'), 'w') as f:
+        json.dump(schema, f, indent = 1)
+    return schema
+
+
+# 4.1 Load schema of a table. Build it if it does not exist.
+
+def load_schema(table, folder = None):
+    folder = schema_folder if folder is None else folder
+    filename = os.path.join(folder, table + '.json')
+    if not os.path.exists(filename):
+        return build_schema(table, folder)
+    with open(filename) as f:
+        return json.load(f)
+
+
+# 5.0 dtypes to pass on to pd.read_csv(dtype = ...)
+#     'object' columns are parsed straight into
+#     categoricals with the table's shared dictionary.
+#     (A value not in the dictionary is read as NaN;
+#     rebuild the schema when new raw files arrive.)
+
+def read_dtypes(table, folder = None):
+    dtypes = {}
+    for col, s in load_schema(table, folder).items():
+        if s['dtype'] == 'category' and 'categories' in s:
+            dtypes[col] = pd.CategoricalDtype(s['categories'])
+        else:
+            dtypes[col] = s['dtype']
+    return dtypes
+
+
+# 5.1 'object' columns of a table (these are read as 'category')
+
+def categorical_columns(table, folder = None):
+    return [col for col, s in load_schema(table, folder).items() if s['kind'] == 'object']
+
+
+# 5.2 All columns of a table in file order
+
+def columns(table, folder = None):
+    return list(load_schema(table, folder))
@@ -0,0 +1,605 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Sorted-segment aggregation: a replacement for
+#           df.groupby(key).agg({...}).
+#
+#           For an aggregation dictionary, pandas runs a separate
+#           grouped reduction for every (column, stat) pair. Here:
+#             i)   rows are sorted by key once. Rows of one key then
+#                  form a contiguous segment; segment starts are
+#                  the offsets
+#            ii)   every column is gathered in sorted order once and
+#                  reduced segment by segment with numpy's ufunc
+#                  .reduceat(): count, sum, min, max
+#           iii)   mean is sum/count. var (and std) use this mean for
+#                  the second moment of each segment; (sumsq - sum*mean)
+#                  loses precision on large AMT_* columns
+#            iv)   results are computed once per column and shared by
+#                  all stats that need them
+#             v)   conditional aggregations (eg over ACTIVE and CLOSED
+#                  credits) reduce the same gathered column under
+#                  boolean masks. No subset frames are made.
+#            vi)   two-level aggregations (bureau_balance --> bureau
+#                  --> client) aggregate per-bureau results (bb_agg)
+#                  straight up to SK_ID_CURR, through SK_ID_BUREAU of
+#                  bureau rows. bb_agg is not joined onto bureau.
+#           vii)   windowed aggregations (eg over the last 3, 6, 12
+#                  and 24 months of MONTHS_BALANCE) sort rows by
+#                  (key, time) once. Each window is a tail of every
+#                  segment; its start is a binary search and its
+#                  stats are reduced over its rows. No subset per window.
+#
+#           NaN is skipped exactly as pandas skips it. The same
+#           aggregation dictionaries are accepted and the result
+#           has the same (column, stat) columns as groupby().agg().
+#           So the 'PREFIX_COL_STAT' renames work unchanged.
+#
+# Usage:
+#           import segments
+#           pos_agg = segments.aggregate(pos, 'SK_ID_CURR', aggregations)
+#
+#           seg = segments.Segments(bureau['SK_ID_CURR'])    # sort once
+#           agg = seg.aggregate(bureau, num_aggregations)    # reuse
+#           by_status = seg.aggregate_where(bureau, num_aggregations,
+#                                           {'ACTIVE': bureau['CREDIT_ACTIVE'] == 'Active'})
+#
+#           up = seg.reduce_children(bb_agg, bureau['SK_ID_BUREAU'],
+#                                    {'all': (None, {'MONTHS_BALANCE_SIZE': ['mean', 'sum']})})
+#
+#           seg = segments.Segments(pos['SK_ID_CURR'], within = pos['MONTHS_BALANCE'])
+#           last = seg.reduce_windows(pos, {'SK_DPD': ['max', 'mean']}, {'LAST3': -3, 'LAST12': -12})
+#
+#           With backend = 'numba', reductions run in compiled
+#           kernels on all cores (see kernels.py)
+#
+#           Check of all the above against groupby().agg() on a
+#           synthetic frame; from command line:
+#           python segments.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import numpy as np
+import pandas as pd
+
+# 1.1 Optional compiled kernels. See kernels.py
+import kernels
+
+
+# 2.0 Stats that can be asked for
+stats_supported = ('min', 'max', 'mean', 'sum', 'var', 'std', 'size', 'count', 'nunique')
+
+# 2.1 Default backend: 'numpy' (ufunc.reduceat) or 'numba'
+#     (compiled kernels, if numba is installed; else 'numpy')
+default_backend = "numpy"
+
+
+# 3.0 Rows of a table, sorted by key, as segments
+
+class Segments:
+
+    def __init__(self, keys, backend = None, within = None):
+        self.key = getattr(keys, 'name', None)
+        self.backend = default_backend if backend is None else backend
+        keys = np.asarray(keys)
+        # 3.0.1 within (eg MONTHS_BALANCE): rows of a key are
+        #       also sorted by it. It is held as ranks of its
+        #       distinct values; NaN ranks first (see 3.10)
+        t, self.within_values = (None, None) if within is None else _ranks(within)
+        # 3.1 Already sorted (eg as read from featurestore): no sort
+        in_order = len(keys) < 2 or (keys[1:] >= keys[:-1]).all()
+        if in_order and t is not None and len(keys) > 1:
+            in_order = ((keys[1:] > keys[:-1]) | (t[1:] >= t[:-1])).all()
+        if in_order:
+            self.order = None
+        elif t is None:
+            self.order = np.argsort(keys, kind = 'stable')
+        else:
+            # 3.1.1 One sort on (key rank, time rank) as one int
+            codes, _ = pd.factorize(keys, sort = True)
+            self.order = np.argsort(codes.astype(np.int64) * len(self.within_values) + t, kind = 'stable')
+        sorted_keys = self.gather(keys)
+        self.within = None if t is None else self.gather(t)
+        # 3.2 Offsets of segments and their keys
+        if len(keys):
+            self.starts = np.concatenate(([0], np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1))
+        else:
+            self.starts = np.array([], dtype = np.int64)
+        self.ids = sorted_keys[self.starts]
+        self.size = np.diff(np.append(self.starts, len(keys)))
+        self.ends = self.starts + self.size
+        self.n_rows = len(keys)
+
+
+    # 3.2.1 Segments of rows already sorted by key, from
+    #       their offsets (see clientindex.py): rows of
+    #       ids[i] are [offsets[i], offsets[i + 1]). Keys
+    #       are neither sorted nor compared. within: rows
+    #       are sorted by it inside their segments only.
+    @classmethod
+    def from_offsets(cls, ids, offsets, key = None, backend = None, within = None):
+        seg = cls.__new__(cls)
+        seg.key = key
+        seg.backend = default_backend if backend is None else backend
+        offsets = np.asarray(offsets, dtype = np.int64)
+        seg.ids = np.asarray(ids)
+        seg.starts = offsets[:-1]
+        seg.size = np.diff(offsets)
+        seg.ends = offsets[1:]
+        seg.n_rows = int(offsets[-1]) if len(offsets) else 0
+        seg.within, seg.within_values, seg.order = None, None, None
+        if within is not None:
+            t, seg.within_values = _ranks(within)
+            if len(t) != seg.n_rows:
+                raise ValueError("Offsets are not of these rows")
+            segment = np.repeat(np.arange(len(seg.ids), dtype = np.int64), seg.size)
+            if len(t) > 1 and not ((segment[1:] > segment[:-1]) | (t[1:] >= t[:-1])).all():
+                seg.order = np.argsort(segment * len(seg.within_values) + t, kind = 'stable')
+            seg.within = seg.gather(t)
+        return seg
+
+
+    # 3.3 Values of a column in sorted order
+    def gather(self, values):
+        values = np.asarray(values)
+        return values if self.order is None else values[self.order]
+
+
+    # 3.4 Sum of values over segments
+    def sum(self, x):
+        if len(x) == 0:
+            return np.zeros(0, dtype = x.dtype)
+        return np.add.reduceat(x, self.starts)
+
+
+    # 3.5 Aggregate a frame (rows as of keys) as per
+    #     a dictionary {column: [stats]} (or one list of
+    #     stats for all non-key columns). Returns a frame
+    #     indexed by key, with columns (column, stat).
+
+    def aggregate(self, df, aggregations):
+        result = self._aggregate(df, aggregations, {None: None})[None]
+        agg = pd.DataFrame(result, index = pd.Index(self.ids, name = self.key))
+        agg.columns = pd.MultiIndex.from_tuples(list(result)) if result else agg.columns
+        return agg
+
+
+    # 3.6 Conditional aggregation. For every named condition
+    #     (a boolean mask over rows of df) aggregate only the
+    #     rows that meet it. No subset frames are made: every
+    #     column is gathered once and reduced for all
+    #     conditions. Returns {name: frame} with columns
+    #     named <name>_<column>_<STAT>. As with groupby() over
+    #     a subset, keys without any such row are left out.
+    #       Eg: {'ACTIVE': bureau['CREDIT_ACTIVE'] == 'Active'}
+
+    def aggregate_where(self, df, aggregations, conditions):
+        masks = {name: self.gather(np.asarray(mask, dtype = bool))
+                 for name, mask in conditions.items()}
+        results = self._aggregate(df, aggregations, masks)
+        frames = {}
+        for name, result in results.items():
+            agg = pd.DataFrame({name + "_" + col + "_" + stat.upper(): values
+                                for (col, stat), values in result.items()},
+                               index = pd.Index(self.ids, name = self.key))
+            frames[name] = agg[self.sum(masks[name].astype(np.int64)) > 0]
+        return frames
+
+
+    # 3.7 Stats of all columns for every mask
+    #     (None: all rows). Returns, per mask,
+    #     {(column, stat): values}
+
+    def _aggregate(self, df, aggregations, masks):
+        return self.reduce(df, {name: (where, aggregations) for name, where in masks.items()})
+
+
+    # 3.8 Several aggregations, each under its own mask (already
+    #     in sorted order; None: all rows), over the same sort.
+    #     requests: {name: (mask, aggregations)}
+    #     A column asked for by many requests is gathered once.
+    #     Returns, per request, {(column, stat): values} in the
+    #     order of its own aggregations.
+
+    def reduce(self, df, requests):
+        asked = {}
+        for name, (where, aggregations) in requests.items():
+            if not isinstance(aggregations, dict):
+                aggregations = {col: list(aggregations) for col in df.columns if col != self.key}
+            asked[name] = {col: [stats] if isinstance(stats, str) else list(stats)
+                           for col, stats in aggregations.items()}
+        columns = []
+        for aggregations in asked.values():
+            columns += [col for col in aggregations if col not in columns]
+
+        computed = {name: {} for name in requests}
+        for col in columns:
+            column = df[col]
+            x = self.gather(column.to_numpy())
+            for name, (where, _) in requests.items():
+                if col in asked[name]:
+                    computed[name][col] = _column_stats(self, x, column.dtype, asked[name][col], where)
+
+        return {name: {(col, stat): computed[name][col][stat]
+                       for col, stats in aggregations.items() for stat in stats}
+                for name, aggregations in asked.items()}
+
+
+    # 3.9 Two-level aggregation. 'child' has one row per child
+    #     key (eg bb_agg, per SK_ID_BUREAU); child_keys gives the
+    #     child key of every row of this table (eg bureau's
+    #     SK_ID_BUREAU). Stats of child columns are aggregated up
+    #     to this key (eg SK_ID_CURR) as if child had been joined
+    #     onto this table; but the widened table is never made.
+    #     Only rows that have a child are visited. Rows without
+    #     one count as NaN: as after a left join, int columns
+    #     then become float64 and such keys get sum 0, mean NaN.
+    #     requests: as in reduce(). Returns as reduce() does.
+
+    def reduce_children(self, child, child_keys, requests):
+        position = self.gather(child.index.get_indexer(np.asarray(child_keys)))
+        found = position >= 0
+        keys = np.repeat(self.ids, self.size)[found]
+        sub = Segments(pd.Series(keys, name = self.key), self.backend)
+        columns = []
+        for _, aggregations in requests.values():
+            columns += [col for col in aggregations if col not in columns]
+        values = child[columns].iloc[position[found]].reset_index(drop = True)
+        if not found.all():
+            values = values.astype({col: np.float64 for col in columns
+                                    if values[col].dtype.kind in 'biu'})
+
+        # 3.9.1 Segments of rows with a child are a
+        #       subset of segments of this table
+        at = np.searchsorted(self.ids, sub.ids)
+        results = sub.reduce(values, {name: (None if where is None else where[found], aggregations)
+                                      for name, (where, aggregations) in requests.items()})
+        for name, result in results.items():
+            where = requests[name][0]
+            for (col, stat), v in result.items():
+                if stat == 'size':
+                    # 3.9.2 Rows without a child count too
+                    result[(col, stat)] = (self.size.astype(np.int64) if where is None
+                                           else self.sum(where.astype(np.int64)))
+                elif len(sub.ids) < len(self.ids):
+                    fill = 0 if stat in ('sum', 'count', 'nunique') else np.nan
+                    full = np.full(len(self.ids), fill, dtype = v.dtype)
+                    full[at] = v
+                    result[(col, stat)] = full
+        return results
+
+
+    # 3.10 Windowed aggregation over the most recent rows of
+    #      every key. Rows must be sorted 'within' keys (eg by
+    #      MONTHS_BALANCE, see 3.0.1). A window is the rows whose
+    #      'within' value is at least its bound; eg bound -3 for
+    #      the last 3 months. These are the last rows of a segment,
+    #      so its start is found by binary search; all windows
+    #      share one sort. All stats come from reduceat() over
+    #      window bounds; var from squared deviations about the
+    #      window mean, in a second pass (see 3.11). With backend
+    #      'numba', kernels reduce each window's rows instead.
+    #      bounds: {window name: bound}
+    #      Returns, per window, {(column, stat): values}. All are
+    #      float; keys without a row in a window get NaN, just as
+    #      if the window's rows were aggregated and left-joined.
+
+    def reduce_windows(self, df, aggregations, bounds):
+        if self.within is None:
+            raise ValueError("Segments were not sorted 'within' keys")
+        # 3.10.1 Window starts: (segment, rank of 'within') as
+        #        one sorted int, for np.searchsorted
+        stride = len(self.within_values) + 1
+        segment = np.arange(len(self.starts), dtype = np.int64) * stride
+        composite = np.repeat(segment, self.size) + self.within
+        starts = {name: np.searchsorted(composite, segment + np.searchsorted(self.within_values, bound))
+                  for name, bound in bounds.items()}
+        use_kernels = self.backend == 'numba' and kernels.available() and len(composite) > 0
+        results = {name: {} for name in bounds}
+        for col, stats in aggregations.items():
+            stats = [stats] if isinstance(stats, str) else stats
+            unknown = [s for s in stats if s not in stats_supported or s == 'nunique']
+            if unknown:
+                raise ValueError("Unsupported window aggregation(s): " + ", ".join(unknown))
+            column = df[col]
+            out_float = column.dtype if column.dtype.kind == 'f' else np.dtype(np.float64)
+            x = self.gather(column.to_numpy()).astype(np.float64)
+            # 3.10.2 Compiled kernels (see kernels.py) visit only
+            #        the rows of each window; else reduceat()
+            #        over window bounds (see 3.11)
+            for name, start in starts.items():
+                n_rows = (self.ends - start).astype(np.float64)
+                if use_kernels:
+                    m = kernels.moments(x, start, self.ends)
+                    n = m['count']
+                    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                        shared = {'count': n, 'sum': m['sum'], 'mean': m['sum'] / n,
+                                  'var': np.where(n > 1, m['m2'] / (n - 1), np.nan),
+                                  'min': m['min'], 'max': m['max']}
+                else:
+                    shared = _window_stats(self, x, start, self.ends, n_rows, stats)
+                # 3.10.3 Rounding can never make a variance negative
+                shared['var'] = np.maximum(shared['var'], 0)
+                for stat in stats:
+                    if stat == 'size':
+                        v = n_rows
+                    elif stat == 'std':
+                        v = np.sqrt(shared['var'])
+                    else:
+                        v = shared[stat]
+                    v = np.where(n_rows == 0, np.nan, v)
+                    if stat not in ('size', 'count'):
+                        v = v.astype(out_float)
+                    results[name][(col, stat)] = v
+        return results
+
+
+# 3.11 count, sum, mean, var (and min, max if asked) over
+#      windows [start, end) of segments, as in _column_stats():
+#      sums over the rows of each window, then squared
+#      deviations from the mean of the window (a second
+#      pass). x as gathered.
+
+def _window_stats(seg, x, start, end, n_rows, stats):
+    # 3.11.1 reduceat over [start, end) pairs; a sentinel
+    #        keeps the last 'end' within range. Empty
+    #        windows give 0 (NaN for fmin/fmax)
+    bounds = np.column_stack((start, end)).ravel()
+    empty = end <= start
+    def over_windows(ufunc, v, sentinel = 0):
+        out = ufunc.reduceat(np.append(v, sentinel), bounds)[::2]
+        return np.where(empty, 0 if sentinel == 0 else np.nan, out)
+
+    nan = np.isnan(x)
+    has_nan = nan.any()
+    n = over_windows(np.add, (~nan).astype(np.int64)).astype(np.float64) if has_nan else n_rows
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        total = over_windows(np.add, np.where(nan, 0, x) if has_nan else x)
+        mean = total / n
+        # 3.11.2 inf values (eg PAYMENT_PERC) give NaN, as in pandas
+        dev = x - np.repeat(mean, seg.size)
+        dev = np.where(nan, 0, dev) if has_nan else dev
+        var = over_windows(np.add, dev * dev) / (n - 1)
+    shared = {'count': n, 'sum': total, 'mean': mean, 'var': np.where(n > 1, var, np.nan)}
+    for stat in ('min', 'max'):
+        if stat in stats:
+            shared[stat] = over_windows(np.fmin if stat == 'min' else np.fmax, x, np.nan)
+    return shared
+
+
+# 3.12 Ranks of distinct values of 'within' (see 3.0.1)
+#      and those values. NaN ranks first.
+
+def _ranks(within):
+    t = np.asarray(within, dtype = np.float64)
+    return pd.factorize(np.where(np.isnan(t), -np.inf, t), sort = True)
+
+
+# 4.0 All asked stats of one column (values already
+#     in sorted order), sharing work between them.
+#     where: only rows where it is True are used.
+#     Output dtypes are as in pandas (except that
+#     sums of ints are always int64).
+
+def _column_stats(seg, x, dtype, stats, where = None):
+    unknown = [s for s in stats if s not in stats_supported]
+    if unknown:
+        raise ValueError("Unsupported aggregation(s): " + ", ".join(unknown))
+
+    is_float = x.dtype.kind == 'f'
+    out_float = x.dtype if is_float else np.dtype(np.float64)
+    shared = {}
+
+    # 4.0.1 Compiled kernels give count, sum, min, max
+    #       and var in one go (see kernels.py)
+    use_kernels = seg.backend == 'numba' and kernels.available() and len(x) > 0
+    if use_kernels and any(s in stats for s in ('count', 'sum', 'mean', 'var', 'std', 'min', 'max')):
+        m = kernels.moments(x, seg.starts, seg.ends, where)
+        n = m['count']
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            shared.update({
+                           'count': n,
+                           'sum':   m['sum'] if is_float else np.round(m['sum']).astype(np.int64),
+                           'mean':  m['sum'] / n,
+                           'var':   np.where(n > 1, m['m2'] / (n - 1), np.nan),
+                           'min':   m['min'],
+                           'max':   m['max']
+                          })
+
+    # 4.1 Computed on first need; then reused
+    #     Rows left out (NaN, or not 'where') are 'missing'
+    def nan_mask():
+        if 'nan' not in shared:
+            nan = np.isnan(x) if is_float else None
+            if where is not None:
+                nan = ~where if nan is None else nan | ~where
+            shared['nan'] = nan
+        return shared['nan']
+
+    def count():
+        if 'count' not in shared:
+            nan = nan_mask()
+            shared['count'] = seg.size if nan is None else seg.sum((~nan).astype(np.int64))
+        return shared['count']
+
+    def total():
+        if 'sum' not in shared:
+            nan = nan_mask()
+            if is_float:
+                shared['sum'] = seg.sum(np.where(nan, 0, x).astype(np.float64))
+            else:
+                values = x.astype(np.int64)
+                shared['sum'] = seg.sum(values if nan is None else np.where(nan, 0, values))
+        return shared['sum']
+
+    def mean():
+        if 'mean' not in shared:
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                shared['mean'] = total() / count()
+        return shared['mean']
+
+    def var():
+        if 'var' not in shared:
+            nan = nan_mask()
+            n = count()
+            # 4.1.1 inf values (eg PAYMENT_PERC) give NaN, as in pandas
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                dev = x - np.repeat(mean(), seg.size)
+                dev = np.where(nan, 0, dev) if nan is not None else dev
+                v = seg.sum(dev * dev) / (n - 1)
+            shared['var'] = np.where(n > 1, v, np.nan)
+        return shared['var']
+
+    result = {}
+    for stat in stats:
+        if stat == 'size':
+            result[stat] = seg.size.astype(np.int64) if where is None else seg.sum(where.astype(np.int64))
+        elif stat == 'count':
+            result[stat] = count().astype(np.int64)
+        elif stat == 'sum':
+            result[stat] = total().astype(out_float) if is_float else total()
+        elif stat == 'mean':
+            result[stat] = mean().astype(out_float)
+        elif stat == 'var':
+            result[stat] = var().astype(out_float)
+        elif stat == 'std':
+            result[stat] = np.sqrt(var()).astype(out_float)
+        elif stat in ('min', 'max'):
+            # 4.2 fmin/fmax skip NaN; an all-NaN segment stays NaN
+            if len(x) == 0:
+                result[stat] = x[:0]
+            elif stat in shared:
+                values = shared[stat]
+                result[stat] = values.astype(x.dtype) if is_float else np.where(shared['count'] > 0, values, 0).astype(dtype)
+            elif is_float:
+                ufunc = np.fmin if stat == 'min' else np.fmax
+                values = x if where is None else np.where(where, x, np.nan)
+                result[stat] = ufunc.reduceat(values, seg.starts)
+            else:
+                # 4.2.1 Rows not in 'where' take a value that
+                #       cannot win. (A key with no such row at
+                #       all is dropped by aggregate_where())
+                ufunc = np.minimum if stat == 'min' else np.maximum
+                values = x
+                if where is not None:
+                    values = np.where(where, x, x.max() if stat == 'min' else x.min())
+                result[stat] = ufunc.reduceat(values, seg.starts).astype(dtype)
+        elif stat == 'nunique':
+            if use_kernels:
+                result[stat] = kernels.nunique(x, seg.starts, seg.ends, where)
+            else:
+                result[stat] = _nunique(seg, x, nan_mask())
+    return result
+
+
+# 4.3 Number of distinct (non NaN) values per segment.
+#     Values are sorted within their segments; a value
+#     is new where it differs from the previous one.
+
+def _nunique(seg, x, nan):
+    segment = np.repeat(np.arange(len(seg.starts)), seg.size)
+    keep = slice(None) if nan is None else ~nan
+    segment, values = segment[keep], x[keep]
+    order = np.lexsort((values, segment))
+    segment, values = segment[order], values[order]
+    new = np.ones(len(values), dtype = bool)
+    new[1:] = (segment[1:] != segment[:-1]) | (values[1:] != values[:-1])
+    return np.bincount(segment[new], minlength = len(seg.starts)).astype(np.int64)
+
+
+# 5.0 Drop-in for df.groupby(key).agg(aggregations)
+
+def aggregate(df, key, aggregations, backend = None):
+    return Segments(df[key], backend).aggregate(df, aggregations)
+
+
+# 6.0 A synthetic monthly table, for checks: keys out of
+#     order, NaN in a float and an 'object' column, and
+#     amounts large enough for a naive variance to drift
+
+def synthetic(n_keys = 400, n_rows = 20000, seed = 0):
+    rng = np.random.default_rng(seed)
+    curr = rng.integers(0, n_keys, n_rows) + 100000
+    df = pd.DataFrame({
+                       'SK_ID_CURR':     curr,
+                       'SK_ID_PREV':     curr * 4 + rng.integers(0, 4, n_rows),
+                       'MONTHS_BALANCE': -rng.integers(1, 37, n_rows),
+                       'AMT_BALANCE':    rng.lognormal(12, 2, n_rows),
+                       'SK_DPD':         rng.poisson(2, n_rows) * (rng.random(n_rows) < 0.2),
+                       'STATUS':         rng.choice(np.array(['A', 'B', 'C', None], dtype = object), n_rows,
+                                                    p = [0.5, 0.3, 0.15, 0.05])
+                      })
+    df.loc[rng.random(n_rows) < 0.1, 'AMT_BALANCE'] = np.nan
+    return df
+
+
+# 6.1 Columns in which two frames (of the same keys)
+#     differ: missing on one side, or values not equal
+#     within rounding (that of float32, if either column
+#     is float32). NaN equals NaN.
+
+def mismatched(got, expected, rtol = 1e-7):
+    if not got.index.equals(expected.index):
+        return ['(keys)']
+    differ = [str(c) for c in expected.columns if c not in got.columns]
+    differ += [str(c) for c in got.columns if c not in expected.columns]
+    for col in expected.columns:
+        if col not in got.columns:
+            continue
+        single = np.float32 in (got[col].dtype, expected[col].dtype)
+        if not np.allclose(got[col].to_numpy(np.float64), expected[col].to_numpy(np.float64),
+                           rtol = max(rtol, 8 * np.finfo(np.float32).eps) if single else rtol,
+                           atol = 1e-9, equal_nan = True):
+            differ.append(str(col))
+    return differ
+
+
+# 7.0 Self-check: aggregate(), aggregate_where(),
+#     reduce_children() and reduce_windows() against
+#     groupby().agg() on synthetic(), on every backend.
+#     Returns, per check, the columns that differ (none
+#     if all is well). From command line: python segments.py
+
+def check(df = None):
+    df = synthetic() if df is None else df
+    key = 'SK_ID_CURR'
+    aggregations = {'AMT_BALANCE': list(stats_supported), 'SK_DPD': list(stats_supported),
+                    'MONTHS_BALANCE': ['min', 'max', 'mean']}
+    windowed = {c: [s for s in stats if s != 'nunique'] for c, stats in aggregations.items()}
+    late = (df['SK_DPD'] > 0).to_numpy()
+    # 7.1 Every other SK_ID_PREV has a child row
+    child = df.groupby('SK_ID_PREV').agg(PREV_AMT = ('AMT_BALANCE', 'mean'), PREV_DPD = ('SK_DPD', 'max')).iloc[::2]
+    up = {'PREV_AMT': ['mean', 'sum', 'max', 'size'], 'PREV_DPD': ['min', 'mean', 'count']}
+    ids = pd.Index(np.sort(df[key].unique()), name = key)
+
+    expected = {
+                'aggregate':       df.groupby(key).agg(aggregations),
+                'aggregate_where': df[late].groupby(key).agg(aggregations),
+                'reduce_children': df.join(child, on = 'SK_ID_PREV').groupby(key).agg(up),
+                'reduce_windows':  df[df['MONTHS_BALANCE'] >= -3].groupby(key).agg(windowed).reindex(ids)
+               }
+    expected['aggregate_where'].columns = pd.Index(["LATE_" + col + "_" + stat.upper()
+                                                    for col, stat in expected['aggregate_where'].columns])
+
+    rows = []
+    for backend in ['numpy'] + (['numba'] if kernels.available() else []):
+        seg = Segments(df[key], backend)
+        by_time = Segments(df[key], backend, within = df['MONTHS_BALANCE'])
+        got = {
+               'aggregate':       seg.aggregate(df, aggregations),
+               'aggregate_where': seg.aggregate_where(df, aggregations, {'LATE': late})['LATE'],
+               'reduce_children': pd.DataFrame(seg.reduce_children(child, df['SK_ID_PREV'],
+                                                                    {None: (None, up)})[None], index = ids),
+               'reduce_windows':  pd.DataFrame(by_time.reduce_windows(df, windowed, {'LAST3': -3})['LAST3'],
+                                               index = ids)
+              }
+        for name, frame in expected.items():
+            rows.append({'check': name, 'backend': backend, 'columns': frame.shape[1],
+                         'differ': ", ".join(mismatched(got[name], frame))})
+    return pd.DataFrame(rows).set_index(['check', 'backend'])
+
+
+if __name__ == '__main__':
+    print(check())
@@ -0,0 +1,233 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Hash-partitioned, multi-process aggregation.
+#
+#           plan.execute() (see planner.py) runs on one core. Here
+#           a table is split by a hash of its key (SK_ID_CURR, or
+#           SK_ID_BUREAU for bureau_balance) into N shards:
+#             i)   rows of a shard are made contiguous by one stable
+#                  sort on shard number. So, within a key, rows keep
+#                  their order
+#            ii)   columns are copied once, in that order, into one
+#                  block of shared memory. 'object' columns go as
+#                  categorical codes; every shard sees all categories,
+#                  so all shards make the same dummy columns
+#           iii)   each worker process maps its slice of the block,
+#                  runs plan.execute() on it and returns its frames
+#            iv)   frames of all shards are concatenated and sorted
+#                  by key
+#
+#           A key lands in exactly one shard and its rows are reduced
+#           in the same order as in a serial run; so results are the
+#           same, windows included.
+#
+#           A child frame (eg bb_agg for bureau) is shared as well;
+#           each worker takes only rows its shard links to.
+#
+# Usage:
+#           import shards
+#           pos_agg = shards.execute(plan, 'pos_cash_balance', pos, 32)['pos']
+#
+#           n_shards = 1 calls plan.execute() directly.
+#
+#           Check of sharded runs against groupby().agg() on a
+#           synthetic table; from command line: python shards.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import numpy as np
+import pandas as pd
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# 1.1 Workers are given only one core's worth of
+#     numba threads. See kernels.py
+import kernels
+
+
+# 2.0 Shard of every key. A multiplicative hash: keys
+#     that are close (eg SK_ID_CURR) are spread out.
+
+def shard_of(keys, n_shards):
+    h = np.asarray(keys).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return ((h >> np.uint64(32)) % np.uint64(n_shards)).astype(np.int64)
+
+
+# 3.0 Copy columns of df (rows in 'order') into one new
+#     block of shared memory. Returns the block and a
+#     layout: [(column, kind, dtype, offset, extra)]
+
+def share(df, order = None):
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.SparseDtype):
+            columns.append((col, 'sparse', s.sparse.to_dense().to_numpy(), s.dtype.fill_value))
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            columns.append((col, 'category', s.cat.codes.to_numpy(), s.dtype))
+        elif s.dtype == 'object':
+            s = s.astype('category')
+            columns.append((col, 'category', s.cat.codes.to_numpy(), s.dtype))
+        elif isinstance(s.dtype, np.dtype):
+            columns.append((col, 'numpy', s.to_numpy(), None))
+        else:
+            raise TypeError("Column " + str(col) + " of dtype " + str(s.dtype) + " cannot be shared")
+
+    # 3.1 Each column at an offset aligned to 8 bytes
+    offsets, size = [], 0
+    for _, _, values, _ in columns:
+        offsets.append(size)
+        size += -(-values.nbytes // 8) * 8
+    block = shared_memory.SharedMemory(create = True, size = max(size, 8))
+    layout = []
+    for (col, kind, values, extra), offset in zip(columns, offsets):
+        view = np.ndarray(values.shape, dtype = values.dtype, buffer = block.buf, offset = offset)
+        view[:] = values if order is None else values[order]
+        layout.append((col, kind, values.dtype, offset, extra))
+    return block, layout
+
+
+# 3.1 Rows [lo, hi) of a shared frame; or only 'rows'
+#     (positions), if given. Values are copied out, so
+#     the block can be closed after.
+
+def frame(block, layout, n_rows, lo = 0, hi = None, rows = None):
+    hi = n_rows if hi is None else hi
+    data = {}
+    for col, kind, dtype, offset, extra in layout:
+        values = np.ndarray(n_rows, dtype = dtype, buffer = block.buf, offset = offset)
+        values = values[lo:hi].copy() if rows is None else values[rows]
+        if kind == 'category':
+            data[col] = pd.Categorical.from_codes(values, dtype = extra)
+        elif kind == 'sparse':
+            data[col] = pd.arrays.SparseArray(values, fill_value = extra)
+        else:
+            data[col] = values
+    return pd.DataFrame(data)
+
+
+# 3.2 One column of a shared frame, in place (no copy).
+#     Category columns are their codes.
+
+def column(block, layout, n_rows, name):
+    for col, kind, dtype, offset, extra in layout:
+        if col == name:
+            return np.ndarray(n_rows, dtype = dtype, buffer = block.buf, offset = offset)
+    raise KeyError(name)
+
+
+# 4.0 Worker: aggregate one shard. children: {child stage:
+#     (block name, layout, rows, index name, link column)}
+
+def _work(plan, table, name, layout, n_rows, lo, hi, children, threads, kwargs):
+    if kernels.numba is not None:
+        kernels.numba.set_num_threads(threads)
+    blocks = [shared_memory.SharedMemory(name = name)]
+    try:
+        df = frame(blocks[0], layout, n_rows, lo, hi)
+        linked = {}
+        for child, (child_name, child_layout, child_rows, index, on) in children.items():
+            blocks.append(shared_memory.SharedMemory(name = child_name))
+            # 4.1 Only child rows linked to this shard are
+            #     copied; keys are matched in place
+            keys = column(blocks[-1], child_layout, child_rows, index)
+            rows = np.flatnonzero(np.isin(keys, pd.unique(df[on])))
+            linked[child] = frame(blocks[-1], child_layout, child_rows, rows = rows).set_index(index)
+        return plan.execute(table, df, children = linked, **kwargs)
+    finally:
+        for block in blocks:
+            block.close()
+
+
+# 5.0 Run plan.execute(table, df, ...) over n_shards worker
+#     processes. Keys of all stages of the table must be the
+#     same (eg SK_ID_CURR). Returns {stage: frame}, as
+#     plan.execute() does. A client_index (offsets of rows
+#     of df) is used only by a serial run; rows of shards
+#     are not those of df.
+
+def execute(plan, table, df, n_shards = 1, children = None, **kwargs):
+    children = children or {}
+    if n_shards <= 1 or len(df) == 0:
+        return plan.execute(table, df, children = children, **kwargs)
+    kwargs.pop('client_index', None)
+    keys = {plan.stages[name]['key'] for name in plan.stages_of(table)}
+    if len(keys) != 1:
+        raise ValueError("Stages over " + table + " are keyed by more than one column: " +
+                         ", ".join(sorted(keys)))
+    key = keys.pop()
+
+    # 5.1 Rows of every shard together, in their order
+    shard = shard_of(df[key], n_shards)
+    order = np.argsort(shard, kind = 'stable')
+    bounds = np.searchsorted(shard[order], np.arange(n_shards + 1))
+    blocks = []
+    try:
+        block, layout = share(df, order)
+        blocks.append(block)
+        shared_children = {}
+        for child, child_df in children.items():
+            on = next(plan.stages[name]['children'][child] for name in plan.stages_of(table)
+                      if child in plan.stages[name]['children'])
+            index = child_df.index.name
+            if index is None or index in child_df.columns:
+                raise ValueError("Child " + child + " must be indexed by a named key")
+            child_block, child_layout = share(child_df.reset_index())
+            blocks.append(child_block)
+            shared_children[child] = (child_block.name, child_layout, len(child_df), index, on)
+
+        # 5.2 One task per non-empty shard. Workers are spawned,
+        #     not forked: a fork of a process running numba (or
+        #     BLAS) threads can hang
+        workers = min(n_shards, os.cpu_count() or 1)
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers = workers,
+                                 mp_context = multiprocessing.get_context('spawn')) as pool:
+            tasks = [pool.submit(_work, plan, table, block.name, layout, len(df), lo, hi,
+                                 shared_children, threads, kwargs)
+                     for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+            results = [task.result() for task in tasks]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    # 5.3 Every key is in one shard only
+    return {name: pd.concat([result[name] for result in results]).sort_index()
+            for name in results[0]}
+
+
+# 6.0 Self-check: synthetic stages (see planner.py), child
+#     frame and windows included, over n_shards against
+#     groupby().agg() (see planner.expected()), per
+#     backend. Returns, per stage, the columns that differ
+#     (none if all is well). From command line: python shards.py
+
+def check(df = None, n_shards = 3):
+    import planner
+    import segments
+
+    df = segments.synthetic() if df is None else df
+    child_plan = planner.Plan(planner.synthetic_specs, ['synthetic_prev'])
+    plan = planner.Plan(planner.synthetic_specs, ['synthetic', 'synthetic_late'])
+    children = {'synthetic_prev': child_plan.execute('synthetic', df)['synthetic_prev'].iloc[::2]}
+    want = dict(planner.expected(child_plan, 'synthetic', df),
+                **planner.expected(plan, 'synthetic', df, children, windows = True))
+    rows = []
+    for backend in ('numpy', 'numba'):
+        got = execute(child_plan, 'synthetic', df, n_shards, backend = backend)
+        got.update(execute(plan, 'synthetic', df, n_shards, children = children, backend = backend,
+                           windows = True))
+        for name, frame in want.items():
+            rows.append({'stage': name, 'backend': backend, 'columns': frame.shape[1],
+                         'differ': ", ".join(segments.mismatched(got[name], frame))})
+    return pd.DataFrame(rows).set_index(['stage', 'backend'])
+
+
+if __name__ == '__main__':
+    print(check())
@@ -0,0 +1,297 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Out-of-core aggregation: key-range partitions spilled
+#           to local disk.
+#
+#           Production extracts of bureau_balance and installments
+#           are several times larger than the Kaggle files; they do
+#           not fit in memory. Here, peak memory is set by a budget
+#           (memory_budget_mb), not by the size of the input:
+#             i)   a first pass reads only the key column, chunk by
+#                  chunk, and counts rows per key. Keys are then cut
+#                  into ranges; each range (a partition) has as many
+#                  rows as can be aggregated within the budget
+#            ii)   a second pass reads the needed columns, chunk by
+#                  chunk, and writes the rows of every partition in it
+#                  to a small parquet file in the partition's folder
+#                  on local disk. Rows keep their file order. (No file
+#                  is kept open: open writers would hold buffers for
+#                  every partition at once)
+#           iii)   partitions are then read back one at a time,
+#                  aggregated with plan.execute() (see planner.py)
+#                  and either returned or streamed (as row groups) to
+#                  the feature store. Spilled files are removed; so is
+#                  the spill folder, if it was made for them.
+#
+#           A key is in exactly one partition, and its rows are in
+#           file order; results are the same as an in-memory run.
+#           'object' columns are read back as categoricals with all
+#           values seen in the file, so every partition makes the
+#           same dummy columns.
+#
+#           One key with more rows than a partition can hold still
+#           goes whole into one partition.
+#
+# Usage:
+#           import spill
+#           ins_agg = spill.execute(plan, 'installments_payments',
+#                                   'installments_payments.csv.zip',
+#                                   memory_budget_mb = 2048,
+#                                   prepare = derive_payment_features)['ins']
+#
+#           spill.execute(plan, 'bureau_balance', 'bureau_balance.csv.zip',
+#                         store = {'bureau_balance': 'bb_agg'})    # to featurestore
+#
+#           Check of out-of-core runs against groupby().agg() on a
+#           synthetic file; from command line: python spill.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# 1.1 pyarrow writes spilled partitions
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 1.2 Helper modules in this folder
+import schemas
+import sampling
+import planner
+import featurestore
+import states
+
+
+# 2.0 Where partitions are spilled
+spill_folder = "spill"
+
+# 2.1 Default peak memory, in MB
+memory_budget_mb = 2048
+
+# 2.2 Bytes held, per byte of columns read, while:
+#     parsing a chunk of csv (pandas' text buffers,
+#     the chunk and its split pieces) and
+read_factor = 4
+#     aggregating a partition (sort order, gathered
+#     columns, derived columns, dummies and results)
+working_factor = 10
+
+
+# 3.0 Rows of a chunk and of a partition, within budget.
+#     Every derived feature is taken to be 8 bytes wide.
+
+def sizes(plan, table, usecols, budget_mb = None):
+    budget = (memory_budget_mb if budget_mb is None else budget_mb) * 2**20
+    derived = {c for name in plan.stages_of(table) for c in plan.stages[name]['derived']}
+    row_bytes = planner._row_bytes(table, usecols) + 8 * len(derived)
+    chunk_rows = max(1000, int(budget / (row_bytes * read_factor)))
+    partition_rows = max(1000, int(budget / (row_bytes * working_factor)))
+    return chunk_rows, partition_rows
+
+
+# 3.1 Rows of a sampled chunk (see sampling.py)
+
+def _sampled(chunk, key, fraction, parent_ids):
+    if fraction is None and parent_ids is None:
+        return chunk
+    return sampling.sample_frame(chunk, fraction, key, parent_ids)
+
+
+# 4.0 Pass 1: key ranges. Partition i holds keys in
+#     [bounds[i], bounds[i + 1]). Only the key column is
+#     read; memory is one count per distinct key.
+
+def key_bounds(filename, key, partition_rows, chunk_rows, fraction = None, parent_ids = None):
+    counts = pd.Series(dtype = np.int64)
+    for chunk in pd.read_csv(filename, usecols = [key], chunksize = chunk_rows):
+        chunk = _sampled(chunk, key, fraction, parent_ids)
+        counts = counts.add(chunk[key].value_counts(), fill_value = 0)
+    counts = counts.sort_index()
+    if counts.empty:
+        return np.array([], dtype = np.int64)
+    # 4.1 A new partition starts where the running
+    #     count passes a multiple of partition_rows
+    cumulative = counts.to_numpy().cumsum()
+    part = (cumulative - counts.to_numpy()) // partition_rows
+    starts = np.flatnonzero(np.diff(part, prepend = -1) > 0)
+    return np.append(counts.index.to_numpy()[starts], np.iinfo(np.int64).max).astype(np.int64)
+
+
+# 4.2 Pass 2: rows of every chunk go to the folder of
+#     their partition, one file per chunk. Returns folders
+#     of partitions with rows (in key order) and values
+#     seen in each 'object' column.
+
+def spill(filename, key, bounds, chunk_rows, folder = None, usecols = None, dtype = None,
+          fraction = None, parent_ids = None):
+    folder = spill_folder if folder is None else folder
+    os.makedirs(folder, exist_ok = True)
+    name = os.path.basename(filename).split('.')[0]
+    parts = [os.path.join(folder, "%s_%05d" % (name, i)) for i in range(len(bounds) - 1)]
+    written, schema, values = set(), None, {}
+    for n, chunk in enumerate(pd.read_csv(filename, usecols = usecols, dtype = dtype, chunksize = chunk_rows)):
+        chunk = _sampled(chunk, key, fraction, parent_ids)
+        # 4.2.1 Categories of a 'category' column are fixed only
+        #       if given (see schemas.py); else, as 'object'
+        for col in chunk.columns:
+            if (isinstance(chunk[col].dtype, pd.CategoricalDtype) and
+                    not isinstance((dtype or {}).get(col), pd.CategoricalDtype)):
+                chunk[col] = chunk[col].astype(object)
+        objects = [c for c in chunk.columns if chunk[c].dtype == 'object']
+        for col in objects:
+            values.setdefault(col, set()).update(chunk[col].dropna().unique())
+        # 4.2.2 One schema for all pieces. 'object'
+        #       columns are strings, even if all NaN
+        if schema is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index = False)
+            for col in objects:
+                schema = schema.set(schema.get_field_index(col), pa.field(col, pa.string()))
+        part = np.searchsorted(bounds, chunk[key].to_numpy(), 'right') - 1
+        order = np.argsort(part, kind = 'stable')
+        at = np.searchsorted(part[order], np.arange(len(parts) + 1))
+        for i in np.flatnonzero(np.diff(at)):
+            piece = chunk.iloc[order[at[i]:at[i + 1]]]
+            os.makedirs(parts[i], exist_ok = True)
+            pq.write_table(pa.Table.from_pandas(piece, schema = schema, preserve_index = False),
+                           os.path.join(parts[i], "%06d.parquet" % n))
+            written.add(i)
+    return [p for i, p in enumerate(parts) if i in written], {c: sorted(v) for c, v in values.items()}
+
+
+# 4.3 Read back one partition, its files in chunk order.
+#     'object' columns are categoricals over all values
+#     seen (see 4.2)
+
+def read_partition(folder, values):
+    df = pa.concat_tables([pq.read_table(os.path.join(folder, f))
+                           for f in sorted(os.listdir(folder))]).to_pandas()
+    for col, categories in values.items():
+        df[col] = pd.Categorical(df[col], categories = categories)
+    return df
+
+
+# 5.0 Aggregate a table too large for memory: spill it into
+#     key-range partitions and run plan.execute() on one
+#     partition at a time.
+#       prepare:  function(df) --> df; adds derived features
+#                 to each partition (eg PAYMENT_PERC)
+#       store:    {stage: feature table name}. Results of
+#                 these stages are streamed to the feature
+#                 store (see featurestore.py), not returned
+#       save_states: {stage: name}. Mergeable states of these
+#                 stages (see states.py) are updated partition by
+#                 partition and saved as 'name'; so apply_delta()
+#                 works after an out-of-core run too
+#       kwargs:   passed on to plan.execute()
+#     Returns {stage: frame} of stages not stored.
+
+def execute(plan, table, filename, memory_budget_mb = None, prepare = None, store = None,
+            fraction = None, parent_ids = None, folder = None, save_states = None, **kwargs):
+    store = store or {}
+    save_states = save_states or {}
+    kept_states = {}
+    keys = {plan.stages[name]['key'] for name in plan.stages_of(table)}
+    if len(keys) != 1:
+        raise ValueError("Stages over " + table + " are keyed by more than one column: " +
+                         ", ".join(sorted(keys)))
+    key = keys.pop()
+    usecols = plan.usecols(table)
+    chunk_rows, partition_rows = sizes(plan, table, usecols, memory_budget_mb)
+    bounds = key_bounds(filename, key, partition_rows, chunk_rows, fraction, parent_ids)
+    root = spill_folder if folder is None else folder
+    made_root = not os.path.isdir(root)
+    folder = os.path.join(root, table)
+
+    # 5.1 Stored stages go out partition by partition
+    def partitions(parts, values):
+        for part in parts:
+            df = read_partition(part, values)
+            df = df if prepare is None else prepare(df)
+            for name in save_states:
+                if name in kept_states:
+                    kept_states[name].update(df)
+                else:
+                    kept_states[name] = states.stage_states(plan.stages[name], df,
+                                                            kwargs.get('nan_as_category', True))
+            frames = plan.execute(table, df, **kwargs)
+            del df
+            shutil.rmtree(part)
+            yield frames
+
+    try:
+        parts, values = spill(filename, key, bounds, chunk_rows, folder, usecols,
+                              schemas.read_dtypes(table), fraction, parent_ids)
+        kept, writers = {}, {}
+        for frames in partitions(parts, values):
+            for name, frame in frames.items():
+                if name in store:
+                    if name not in writers:
+                        writers[name] = featurestore.FeatureWriter(store[name], key = key)
+                    writers[name].write(frame)
+                else:
+                    kept.setdefault(name, []).append(frame)
+        for writer in writers.values():
+            writer.close()
+        for name, kept_state in kept_states.items():
+            kept_state.save(save_states[name])
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+        if made_root and os.path.isdir(root) and not os.listdir(root):
+            os.rmdir(root)
+    return {name: pd.concat(frames) for name, frames in kept.items()}
+
+
+# 6.0 Self-check: synthetic stages (see planner.py), child
+#     frame and windows included, spilled into many small
+#     partitions, against groupby().agg() (see
+#     planner.expected()) of the same file read whole. So
+#     are the states saved on the way. All is done in a
+#     temporary folder (schema, spill and states).
+#     Returns, per stage, the columns that differ (none if
+#     all is well). From command line: python spill.py
+
+def check(df = None, memory_budget_mb = 0.01):
+    import json
+    import tempfile
+    import segments
+
+    df = segments.synthetic() if df is None else df
+    child_plan = planner.Plan(planner.synthetic_specs, ['synthetic_prev'])
+    plan = planner.Plan(planner.synthetic_specs, ['synthetic', 'synthetic_late'])
+    cwd = os.getcwd()
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            os.chdir(folder)
+            # 6.1 A schema of the file, as schemas.py builds one
+            df.to_csv('synthetic.csv', index = False)
+            os.makedirs(schemas.schema_folder)
+            with open(os.path.join(schemas.schema_folder, 'synthetic.json'), 'w') as f:
+                json.dump({col: dict(s, dtype = schemas.narrowest_dtype(s))
+                           for col, s in schemas.observe(['synthetic.csv']).items()}, f)
+            whole = pd.read_csv('synthetic.csv', dtype = schemas.read_dtypes('synthetic'))
+            children = {'synthetic_prev': child_plan.execute('synthetic', whole)['synthetic_prev'].iloc[::2]}
+            want = dict(planner.expected(child_plan, 'synthetic', whole),
+                        **planner.expected(plan, 'synthetic', whole, children, windows = True))
+            want['saved states'] = planner.expected(plan, 'synthetic', whole)['synthetic']
+            for backend in ('numpy', 'numba'):
+                got = execute(child_plan, 'synthetic', 'synthetic.csv', memory_budget_mb, backend = backend)
+                got.update(execute(plan, 'synthetic', 'synthetic.csv', memory_budget_mb,
+                                   save_states = {'synthetic': 'synthetic'}, children = children,
+                                   backend = backend, windows = True))
+                got['saved states'] = states.GroupStates.load('synthetic').finalize()[0]
+                for name, frame in want.items():
+                    rows.append({'stage': name, 'backend': backend, 'columns': frame.shape[1],
+                                 'differ': ", ".join(segments.mismatched(got[name], frame))})
+        finally:
+            os.chdir(cwd)
+    return pd.DataFrame(rows).set_index(['stage', 'backend'])
+
+
+if __name__ == '__main__':
+    print(check())
@@ -0,0 +1,474 @@
+# Last amended: 18th October, 2026
+# Myfolder: C:\Users\Administrator\OneDrive\Documents\home_credit_default_risk
+# Objective:
+#           Solving Kaggle problem: Home Credit Default Risk
+#           Mergeable (partial) aggregation states per key.
+#
+#           bureau_balance has 27,299,925 rows. Reading all of it,
+#           OneHotEncoding STATUS into 9 dummies and then aggregating
+#           over SK_ID_BUREAU needs more memory than we have on
+#           the scoring boxes. Instead we read the file in chunks.
+#           For every chunk, we compute, per key, a small 'state':
+#             i)   size, and per numeric column: count (non NaN), sum,
+#                  min, max and M2 (sum of squared deviations from the
+#                  mean; merged as in Chan et al, so variance does not
+#                  lose precision the way sum of squares does)
+#            ii)   per category counts of 'object' columns
+#           iii)   distinct (key, value) pairs, where nunique is needed
+#           States of two chunks can be merged. Once all chunks are
+#           read, states are turned into the very same columns that
+#           groupby().agg() would have produced.
+#
+#           bureau_balance, POS_CASH_balance and credit_card_balance
+#           are monthly snapshots. Their stages can also save states
+#           (save()). A delta file of new months then updates
+#           bb_agg, pos_agg or cc_agg (apply_delta()): only keys in
+#           the delta are merged and finalized again.
+#
+# Usage:
+#           import states
+#           bb_agg, bb_cat = states.stream_bb_agg('bureau_balance.csv.zip')
+#           bb_agg, bb_cat = states.stream_bb_agg('bureau_balance.csv.zip',
+#                                                 save_as = 'bureau_balance')     # and states
+#
+#           states.stage_states(plan.stages['pos'], pos).save('pos')        # full run
+#           pos_agg = states.apply_delta(pos_agg, 'pos', new_pos_rows)    # later
+#
+#           Check of merged states and apply_delta() against
+#           groupby().agg() on a synthetic table; from command line:
+#           python states.py
+#
+# Data Source: https://www.kaggle.com/c/home-credit-default-risk/data
+
+# 1.0 Libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# 1.1 States of a chunk are computed over
+#     key-sorted segments. See segments.py
+import segments
+
+# 1.2 'object' columns of a frame. See onehot.py
+from onehot import categorical_columns
+
+
+# 2.0 Where saved states are kept
+state_folder = "states"
+
+
+# 3.0 Partial states of aggregation per key.
+#     i)   num_columns:      numeric columns. For these we keep
+#                            count, sum, M2, min and max
+#    ii)   cat_columns:      'object' columns. For these we keep,
+#                            per key, count of every category. Mean of
+#                            a dummy column is this count/size.
+#   iii)   nan_as_category:  NaN is also counted as a category
+#                            (same as dummy_na in pd.get_dummies())
+#    iv)   distinct_columns: columns whose distinct values per key
+#                            are kept (for 'nunique')
+#     v)   output:           how finalize() names and aggregates
+#                            (see 3.8); saved along with the state
+
+class GroupStates:
+
+    def __init__(self, key, num_columns = (), cat_columns = (), nan_as_category = True,
+                 distinct_columns = (), output = None):
+        self.key = key
+        self.num_columns = list(num_columns)
+        self.cat_columns = list(cat_columns)
+        self.nan_as_category = nan_as_category
+        self.categories = {col: set() for col in self.cat_columns}
+        self.distinct = {col: None for col in distinct_columns}
+        self.dtypes = {}
+        self.output = output or {}
+        self.state = None
+
+
+    # 3.1 Column names of the state table
+    def _min(self, col):  return col + '_MIN'
+    def _max(self, col):  return col + '_MAX'
+    def _n(self, col):    return col + '_COUNT'
+    def _sum(self, col):  return col + '_SUM'
+    def _m2(self, col):   return col + '_M2'
+    def _cnt(self, col, value):
+        return col + '_' + ('nan' if pd.isnull(value) else str(value))
+
+
+    # 3.2 State of one chunk of rows. Moments are
+    #     computed in float64 (ints are exact in it)
+    def chunk_state(self, chunk):
+        seg = segments.Segments(chunk[self.key])
+        num = chunk[self.num_columns].astype(np.float64)
+        result = seg.reduce(num, {None: (None, {col: ['count', 'sum', 'min', 'max', 'var']
+                                                for col in self.num_columns})})[None]
+        part = {'SIZE': seg.size.astype(np.int64)}
+        for col in self.num_columns:
+            self.dtypes.setdefault(col, str(chunk[col].dtype))
+            n = result[(col, 'count')]
+            part[self._n(col)] = n
+            part[self._sum(col)] = result[(col, 'sum')]
+            part[self._min(col)] = result[(col, 'min')]
+            part[self._max(col)] = result[(col, 'max')]
+            part[self._m2(col)] = np.where(n > 1, result[(col, 'var')] * (n - 1), 0.0)
+        part = pd.DataFrame(part, index = pd.Index(seg.ids, name = self.key))
+        for col in self.cat_columns:
+            values = chunk[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                self.categories[col].update(str(v) for v in values.cat.categories)
+            counts = chunk.groupby([self.key, col], dropna = False, observed = True).size().unstack(fill_value = 0)
+            self.categories[col].update(str(v) for v in counts.columns if not pd.isnull(v))
+            counts.columns = [self._cnt(col, v) for v in counts.columns]
+            part = part.join(counts.astype(np.int64))
+        for col in self.distinct:
+            pairs = chunk[[self.key, col]].dropna().drop_duplicates()
+            self.distinct[col] = _union(self.distinct[col], pd.MultiIndex.from_frame(pairs))
+        return part
+
+
+    # 3.3 Merge a state into another (left). Counts and sums
+    #     add up, min of mins, max of maxs; M2s combine with the
+    #     difference of means. Only keys of 'right' are touched;
+    #     so cost is that of 'right' (eg a delta of new rows).
+    #     Keys (or categories) absent in one of the two states
+    #     are taken from the other one.
+    def merge_states(self, left, right):
+        if left is None:
+            return right
+        missing = [c for c in right.columns if c not in left.columns]
+        if missing:
+            left = left.assign(**{c: np.int64(0) for c in missing})
+        right = right.reindex(columns = left.columns, fill_value = 0)
+        merged = self._combine(left.reindex(right.index), right)
+        old = right.index.isin(left.index)
+        left.loc[merged.index[old]] = merged[old]
+        if (~old).any():
+            left = pd.concat([left, merged[~old]]).sort_index()
+        return left
+
+
+    # 3.4 Combine two states of the same keys (rows of
+    #     'a' are NaN for keys not in it yet)
+    def _combine(self, a, b):
+        out = (a.fillna(0) + b).astype(b.dtypes.to_dict())
+        for col in self.num_columns:
+            na = a[self._n(col)].fillna(0).to_numpy()
+            nb = b[self._n(col)].to_numpy()
+            sa = a[self._sum(col)].fillna(0).to_numpy()
+            sb = b[self._sum(col)].to_numpy()
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                delta = sb / nb - sa / na
+                extra = np.where((na > 0) & (nb > 0), delta * delta * na * nb / (na + nb), 0.0)
+            out[self._m2(col)] = a[self._m2(col)].fillna(0).to_numpy() + b[self._m2(col)].to_numpy() + extra
+            out[self._min(col)] = np.fmin(a[self._min(col)].to_numpy(), b[self._min(col)].to_numpy())
+            out[self._max(col)] = np.fmax(a[self._max(col)].to_numpy(), b[self._max(col)].to_numpy())
+        return out
+
+
+    # 3.5 Add one chunk of rows to the running state
+    def update(self, chunk):
+        self.state = self.merge_states(self.state, self.chunk_state(chunk))
+        return self
+
+
+    # 3.6 Names of dummy columns, in the same order as
+    #     pd.get_dummies() would have created them
+    def dummy_columns(self):
+        dummies = []
+        for col in self.cat_columns:
+            values = sorted(self.categories[col])
+            if self.nan_as_category:
+                values.append('nan')
+            dummies.extend(col + '_' + v for v in values)
+        return dummies
+
+
+    # 3.7 One stat of a numeric column from its state.
+    #     dtypes are as those of segments.aggregate()
+    def _stat(self, state, col, stat):
+        dtype = np.dtype(self.dtypes.get(col, 'float64'))
+        out_float = dtype if dtype.kind == 'f' else np.dtype(np.float64)
+        n = state[self._n(col)].to_numpy()
+        total = state[self._sum(col)].to_numpy()
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            if stat == 'size':
+                return state['SIZE'].to_numpy()
+            if stat == 'count':
+                return n.astype(np.int64)
+            if stat == 'sum':
+                return total.astype(dtype) if dtype.kind == 'f' else np.round(total).astype(np.int64)
+            if stat == 'mean':
+                return (total / n).astype(out_float)
+            if stat in ('var', 'std'):
+                var = np.where(n > 1, state[self._m2(col)].to_numpy() / (n - 1), np.nan)
+                return (var if stat == 'var' else np.sqrt(var)).astype(out_float)
+            if stat in ('min', 'max'):
+                values = state[self._min(col) if stat == 'min' else self._max(col)].to_numpy()
+                return values.astype(dtype) if dtype.kind == 'f' else np.where(n > 0, values, 0).astype(dtype)
+            if stat == 'nunique' and self.distinct.get(col) is not None:
+                keys = self.distinct[col].get_level_values(0)
+                return keys.value_counts().reindex(state.index, fill_value = 0).to_numpy().astype(np.int64)
+        raise ValueError("Statistic '%s' of '%s' is not kept in the state" % (stat, col))
+
+
+    # 3.8 One stat of a dummy column from its count
+    #     per key (a 0/1 column of 'size' rows)
+    @staticmethod
+    def _dummy_stat(count, size, stat):
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            if stat == 'mean':
+                return count / size
+            if stat == 'sum':
+                return count.astype(np.int64)
+            if stat in ('size', 'count'):
+                return size.astype(np.int64)
+            if stat == 'min':
+                return count == size
+            if stat == 'max':
+                return count > 0
+            if stat in ('var', 'std'):
+                var = np.where(size > 1, count * (size - count) / (size * (size - 1.0)), np.nan)
+                return var if stat == 'var' else np.sqrt(var)
+        raise ValueError("Statistic '%s' is not kept for dummy columns" % stat)
+
+
+    # 3.9 Final aggregated table.
+    #     aggregations: {numeric column: [stats]}
+    #     dummy_stats:  stats of every dummy column
+    #     prefix:       column names are '<prefix><col>_<STAT>'
+    #                   as after renaming the multi-index
+    #                   columns of groupby().agg()
+    #     count:        name of a column of rows per key
+    #     keys:         only these keys (default: all)
+    #     Defaults come from 'output' (see 3.0)
+    def finalize(self, aggregations = None, dummy_stats = None, prefix = None, count = None, keys = None):
+        aggregations = self.output.get('aggregations', {}) if aggregations is None else aggregations
+        dummy_stats = self.output.get('dummy_stats', ['mean']) if dummy_stats is None else dummy_stats
+        prefix = self.output.get('prefix', '') if prefix is None else prefix
+        count = self.output.get('count') if count is None else count
+        state = self.state.sort_index() if keys is None else self.state.loc[keys].sort_index()
+        size = state['SIZE'].to_numpy()
+        out = {}
+        for col, stats in aggregations.items():
+            for stat in stats:
+                out[prefix + col + '_' + stat.upper()] = self._stat(state, col, stat)
+        dummies = self.dummy_columns()
+        for dummy in dummies:
+            n = state[dummy].to_numpy() if dummy in state.columns else np.zeros(len(state), dtype = np.int64)
+            for stat in dummy_stats:
+                out[prefix + dummy + '_' + stat.upper()] = self._dummy_stat(n, size, stat)
+        if count:
+            out[count] = size.astype(np.int64)
+        agg = pd.DataFrame(out, index = state.index)
+        agg.index.name = self.key
+        return agg, dummies
+
+
+    # 3.10 Save/load state, its distinct pairs and its
+    #      settings (as json) in folder 'states'
+    def save(self, name, folder = None):
+        folder = state_folder if folder is None else folder
+        os.makedirs(folder, exist_ok = True)
+        self.state.to_parquet(os.path.join(folder, name + '.parquet'))
+        for col, pairs in self.distinct.items():
+            pairs.to_frame(index = False).to_parquet(os.path.join(folder, name + '.' + col + '.parquet'))
+        meta = {
+                'key':              self.key,
+                'num_columns':      self.num_columns,
+                'cat_columns':      self.cat_columns,
+                'nan_as_category':  self.nan_as_category,
+                'distinct_columns': list(self.distinct),
+                'categories':       {col: sorted(v) for col, v in self.categories.items()},
+                'dtypes':           self.dtypes,
+                'output':           self.output
+               }
+        with open(os.path.join(folder, name + '.json'), 'w') as f:
+            json.dump(meta, f, indent = 1)
+
+    @classmethod
+    def load(cls, name, folder = None):
+        folder = state_folder if folder is None else folder
+        with open(os.path.join(folder, name + '.json')) as f:
+            meta = json.load(f)
+        states = cls(meta['key'], meta['num_columns'], meta['cat_columns'], meta['nan_as_category'],
+                     meta['distinct_columns'], meta['output'])
+        states.categories = {col: set(v) for col, v in meta['categories'].items()}
+        states.dtypes = meta['dtypes']
+        states.state = pd.read_parquet(os.path.join(folder, name + '.parquet'))
+        for col in states.distinct:
+            pairs = pd.read_parquet(os.path.join(folder, name + '.' + col + '.parquet'))
+            states.distinct[col] = pd.MultiIndex.from_frame(pairs)
+        return states
+
+
+# 3.11 Union of two sets of (key, value) pairs
+
+def _union(left, right):
+    if left is None:
+        return right
+    return left.append(right[~right.isin(left)])
+
+
+# 4.0 States of a stage, as specified in feature_specs.json
+#     (a stage spec from planner.Plan().stages), over its
+#     raw rows (before dummies are made). Its finalize()
+#     gives the very columns that the stage aggregates.
+#       key:    keep states per this key instead (eg per
+#               SK_ID_PREV for a stage over SK_ID_CURR;
+#               see loans.py). The stage's key is then
+#               not aggregated
+#       extra:  {column: [stats]} also kept in the state,
+#               but not finalized by default
+
+def stage_states(spec, df, nan_as_category = True, key = None, extra = None):
+    if spec['where']:
+        raise ValueError("States of a 'where' stage are not kept")
+    key = spec['key'] if key is None else key
+    skip = [key, spec['key']]
+    cat_columns = categorical_columns(df, exclude = skip)
+    if isinstance(spec['aggregations'], dict):
+        aggregations = spec['aggregations']
+        dummy_stats = ['mean'] if spec['category_means'] else []
+    else:
+        aggregations = {c: spec['aggregations'] for c in df.columns
+                        if c not in skip and c not in cat_columns and c not in spec['exclude']}
+        dummy_stats = spec['aggregations']
+    kept = dict(aggregations)
+    for col, stats in (extra or {}).items():
+        kept[col] = kept.get(col, []) + [s for s in stats if s not in kept.get(col, [])]
+    states = GroupStates(key,
+                         num_columns = list(kept),
+                         cat_columns = cat_columns if dummy_stats else [],
+                         nan_as_category = nan_as_category,
+                         distinct_columns = [c for c, stats in kept.items() if 'nunique' in stats],
+                         output = {
+                                   'aggregations': aggregations,
+                                   'dummy_stats':  dummy_stats,
+                                   'prefix':       spec['prefix'],
+                                   'count':        spec['count']
+                                  }
+                        )
+    return states.update(df)
+
+
+# 4.1 Update an aggregated table (eg pos_agg) with a delta of new
+#     rows, through saved states 'name'. Only keys in the delta
+#     are merged and finalized again; other rows are as they were.
+#     Result is that of aggregating all rows afresh.
+
+def apply_delta(agg, name, delta, folder = None):
+    states = GroupStates.load(name, folder)
+    states.update(delta)
+    states.save(name, folder)
+    keys = pd.Index(pd.unique(delta[states.key]))
+    fresh, _ = states.finalize(keys = keys)
+    # 4.1.1 A category never seen before adds a dummy
+    #       column to all keys: finalize all of them
+    if any(c not in agg.columns for c in fresh.columns):
+        return states.finalize()[0]
+    agg = agg.copy()
+    old = fresh.index.isin(agg.index)
+    agg.loc[fresh.index[old], fresh.columns] = fresh[old]
+    if (~old).any():
+        agg = pd.concat([agg, fresh[~old]]).sort_index()
+    return agg
+
+
+# 5.0 Streaming aggregation of bureau_balance.
+#     Same result as (see bureau.ipynb, 5.0 to 6.4):
+#
+#        bb, bb_cat = one_hot_encoder(bb, nan_as_category)
+#        bb_agg = bb.groupby('SK_ID_BUREAU').agg(bb_aggregations)
+#        bb_agg.columns = pd.Index([e[0] + "_" + e[1].upper() for e in ...])
+#
+#     but peak memory depends upon chunksize and
+#     not upon number of rows in the file.
+#     parent_ids: if given, only rows with these
+#                 SK_ID_BUREAU are aggregated (see sampling.py)
+#     windows:    {'LASTn_': bound}; the same stats over rows with
+#                 MONTHS_BALANCE >= bound too, as plan.execute(...,
+#                 windows = True) makes them (see planner.window_bounds()).
+#                 A window is a filter on rows; it has states of its own
+#     save_as:    also save the states of all rows under this name
+#                 (see 3.10), as stage_states() of 'bureau_balance'
+#                 would be; so apply_delta() updates bb_agg later
+
+def stream_bb_agg(filename = 'bureau_balance.csv.zip', chunksize = 2000000, nan_as_category = True,
+                  parent_ids = None, windows = None, save_as = None, folder = None):
+    aggregations = {'MONTHS_BALANCE': ['min', 'max', 'size']}
+    def bb_states():
+        return GroupStates('SK_ID_BUREAU',
+                           num_columns = ['MONTHS_BALANCE'],
+                           cat_columns = ['STATUS'],
+                           nan_as_category = nan_as_category,
+                           output = {'aggregations': aggregations, 'dummy_stats': ['mean'],
+                                     'prefix': '', 'count': None}
+                          )
+    windows = windows or {}
+    all_states = bb_states()
+    window_states = {name: bb_states() for name in windows}
+    reader = pd.read_csv(filename,
+                         chunksize = chunksize,
+                         dtype = {'STATUS': object}   # '0', '1'.. must stay strings
+                        )
+    for chunk in reader:
+        if parent_ids is not None:
+            chunk = chunk[chunk['SK_ID_BUREAU'].isin(parent_ids)]
+        all_states.update(chunk)
+        for name, bound in windows.items():
+            rows = chunk[chunk['MONTHS_BALANCE'] >= bound]
+            if len(rows):
+                window_states[name].update(rows)
+    if save_as is not None:
+        all_states.save(save_as, folder)
+    bb_agg, bb_cat = all_states.finalize()
+    # 5.1 Windows have the dummies of all rows; keys with
+    #     no row in a window get NaN, and all are float
+    blocks = [bb_agg]
+    for name, w in window_states.items():
+        w.categories = {col: set(v) for col, v in all_states.categories.items()}
+        if w.state is None:
+            w.update(chunk.iloc[:0])
+        agg, _ = w.finalize(prefix = name)
+        blocks.append(agg.reindex(bb_agg.index).astype(np.float64))
+    return pd.concat(blocks, axis = 1), bb_cat
+
+
+# 6.0 Self-check: states of a stage merged chunk by chunk,
+#     and a base run updated by apply_delta(), against
+#     groupby().agg() (see planner.expected()) on
+#     segments.synthetic(). The delta has keys the base
+#     has not seen. Returns, per check, the columns that
+#     differ (none if all is well).
+#     From command line: python states.py
+
+def check(df = None, n_chunks = 5):
+    import tempfile
+    import planner
+
+    df = segments.synthetic() if df is None else df
+    plan = planner.Plan(planner.synthetic_specs, ['synthetic'])
+    spec = plan.stages['synthetic']
+    want = planner.expected(plan, 'synthetic', df)['synthetic']
+    rows = []
+
+    chunks = np.array_split(np.arange(len(df)), n_chunks)
+    merged = stage_states(spec, df.iloc[chunks[0]])
+    for chunk in chunks[1:]:
+        merged.update(df.iloc[chunk])
+    rows.append({'check': 'merged chunks', 'columns': want.shape[1],
+                 'differ': ", ".join(segments.mismatched(merged.finalize()[0], want))})
+
+    in_base = ((df['MONTHS_BALANCE'] < -3) & (df['SK_ID_CURR'] % 10 != 0)).to_numpy()
+    with tempfile.TemporaryDirectory() as folder:
+        base = stage_states(spec, df[in_base])
+        base.save('synthetic', folder)
+        agg = apply_delta(base.finalize()[0], 'synthetic', df[~in_base], folder)
+    rows.append({'check': 'apply_delta', 'columns': want.shape[1],
+                 'differ': ", ".join(segments.mismatched(agg, want))})
+    return pd.DataFrame(rows).set_index('check')
+
+
+if __name__ == '__main__':
+    print(check())